@@ -1,18 +1,31 @@
 import time
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends, Request
 from fastapi.responses import JSONResponse
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Awaitable, Optional, Tuple, TypeVar
 import asyncio
 
 from app.models.schemas import QueryRequest, QueryResponse, SummarizationRequest, SummarizationResponse
 from app.services.llm_service import get_all_llm_responses
-from app.services.embedding_service import get_embedding, calculate_similarities, get_embeddings_batch, calculate_cosine_similarities
+from app.services.embedding_service import (
+    get_embedding, calculate_similarities, get_embeddings_batch, calculate_cosine_similarities,
+    embedding_backends, embedding_backend_stats
+)
 from app.services.summarization_service import SummarizationService
 from app.services.telemetry_service import telemetry, TelemetryService
+from app.services.extraction_cache import extraction_cache
+from app.services.embedding_cache import embedding_cache
+from app.services.rate_limiter import rate_limiter
+from app.services.document_store import DocumentStore, StagedDocument, UploadTooLargeError
+from app.services.pdf_service import ParsedDocument
 
 # Import new hierarchical services
 from app.services.enhanced_pdf_service import EnhancedPDFService
-from app.services.hierarchical_summarizer import HierarchicalSummarizer, HierarchicalSummaryResult
+from app.services.hierarchical_summarizer import (
+    HierarchicalSummarizer, HierarchicalSummaryResult, ProgressCallback, emit_progress, SELECTION_STRATEGIES
+)
+from app.services.job_service import JobManager, JobRunner, JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED
+from app.api.sse import sse_event, sse_response, stream_progress_events
+from app.config import DISCONNECT_POLL_SECONDS
 
 router = APIRouter()
 telemetry_service = TelemetryService()
@@ -20,7 +33,39 @@ summarization_service = SummarizationService()
 
 # Initialize new hierarchical services
 enhanced_pdf_service = EnhancedPDFService()
-hierarchical_summarizer = HierarchicalSummarizer()
+# Share one summarizer (and its bounded chunker caches) across endpoints
+hierarchical_summarizer = enhanced_pdf_service.hierarchical_summarizer
+# Uploads staged by /upload-file, addressed by file_id in the summarize endpoints
+document_store = DocumentStore(pdf_service=enhanced_pdf_service.base_pdf_service)
+# Background summarization jobs with bounded concurrency
+job_manager = JobManager()
+
+T = TypeVar("T")
+
+async def resolve_pdf_input(file: Optional[UploadFile], file_id: Optional[str]) -> Tuple[Optional[bytes], Optional[ParsedDocument], str, float]:
+    """
+    Resolve a summarize request to either raw PDF bytes or an already staged document.
+    
+    Returns:
+        (pdf_content, document, filename, file_size_mb) - exactly one of pdf_content/document is set
+    """
+    if file_id:
+        staged = document_store.get(file_id)
+        if staged is None:
+            raise HTTPException(status_code=404, detail="Unknown or expired file_id. Please upload the file again.")
+        # Extraction started at upload time; this only waits for whatever is left of it
+        document = await document_store.get_document(file_id)
+        return None, document, staged.filename, staged.size_mb
+    
+    if file is None:
+        raise HTTPException(status_code=400, detail="Either a PDF file or a file_id is required")
+    
+    # Validate file type
+    if not file.filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Only PDF files are supported")
+    
+    pdf_content = await file.read()
+    return pdf_content, None, file.filename, len(pdf_content) / (1024 * 1024)
 
 def customize_prompt_for_mode(prompt: str, mode: str) -> str:
     """
@@ -76,6 +121,7 @@ async def health_check():
 async def query_llms(request: QueryRequest):
     """Process a query through all LLM models and return the best response based on similarity."""
     start_time = time.time()
+    validate_embedding_backend(request.embedding_backend)
     
     try:
         # Record telemetry for the query
@@ -88,7 +134,7 @@ async def query_llms(request: QueryRequest):
         all_texts = [request.query] + list(responses.values())
         
         # Get embeddings for query and all responses
-        embeddings = await get_embeddings_batch(all_texts)
+        embeddings = await get_embeddings_batch(all_texts, request.embedding_backend)
         
         # Extract query embedding and response embeddings
         query_embedding = embeddings[0]
@@ -132,25 +178,25 @@ async def query_llms(request: QueryRequest):
 
 @router.post("/summarize")
 async def summarize_pdf(
-    file: UploadFile = File(...),
-    prompt: str = Form(...)
+    prompt: str = Form(...),
+    file: Optional[UploadFile] = File(None),
+    file_id: Optional[str] = Form(None),
+    embedding_backend: Optional[str] = Form(None)
 ):
     """Legacy PDF summarization endpoint - maintained for backward compatibility."""
     start_time = time.time()
+    validate_embedding_backend(embedding_backend)
     
     try:
-        # Validate file type
-        if not file.filename.lower().endswith('.pdf'):
-            raise HTTPException(status_code=400, detail="Only PDF files are supported")
-        
-        # Read PDF content
-        pdf_content = await file.read()
+        # Read PDF content, or reuse the document staged by /upload-file
+        pdf_content, document, filename, file_size_mb = await resolve_pdf_input(file, file_id)
         
         # Log telemetry
         await telemetry_service.log_query_event(prompt, "pdf_summarization", start_time)
         
         # Use the original summarization service for backward compatibility
-        result = await summarization_service.summarize_document(pdf_content, prompt)
+        result = await summarization_service.summarize_document(pdf_content, prompt, document=document,
+                                                                 embedding_backend=embedding_backend)
         
         end_time = time.time()
         processing_time = end_time - start_time
@@ -169,17 +215,173 @@ async def summarize_pdf(
             "message": "Document processed using legacy method"
         })
         
+    except HTTPException:
+        raise
     except Exception as e:
         await telemetry_service.log_error_event("pdf_summarization", str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
+def describe_hierarchical_error(e: Exception) -> str:
+    """Map a summarization failure to a user-facing error message."""
+    error_message = str(e)
+    if "API key" in error_message.lower() or "authentication" in error_message.lower():
+        error_message = "API key configuration error. Please check your environment variables."
+    elif "timeout" in error_message.lower():
+        error_message = "Request timed out. The document might be too large. Try with a smaller PDF."
+    elif "network" in error_message.lower() or "connection" in error_message.lower():
+        error_message = "Network connection error. Please check your internet connection."
+    elif "memory" in error_message.lower():
+        error_message = "Memory limit exceeded. Please try with a smaller document."
+    else:
+        error_message = f"Error processing PDF: {str(e)}"
+    return error_message
+
+def validate_selection_strategy(selection_strategy: Optional[str]):
+    if selection_strategy and selection_strategy.lower() not in SELECTION_STRATEGIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown selection_strategy. Use one of: {', '.join(SELECTION_STRATEGIES)}"
+        )
+
+def validate_embedding_backend(embedding_backend: Optional[str]):
+    if embedding_backend and embedding_backend.lower() not in embedding_backends:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown embedding_backend. Use one of: {', '.join(embedding_backends)}"
+        )
+    if embedding_backend and not embedding_backends[embedding_backend.lower()].available:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Embedding backend '{embedding_backend}' is not installed on this server"
+        )
+
+async def run_until_disconnected(http_request: Request, work: Awaitable[T], operation_type: str) -> T:
+    """
+    Await `work` while watching for the client to disconnect.
+    
+    Starlette keeps running a regular endpoint after its client goes away, so without
+    this every model pipeline would run to completion for nobody. On disconnect the
+    work is cancelled, which cancels its pipelines, in-flight chunk tasks and queued
+    LLM calls, and the cancellation is recorded in telemetry.
+    """
+    start_time = time.time()
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                print(f"🛑 Client disconnected from {operation_type}; cancelling")
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                await telemetry_service.log_cancellation_event(operation_type, {
+                    "reason": "client_disconnected",
+                    "elapsed_seconds": time.time() - start_time
+                })
+                raise HTTPException(status_code=499, detail="Client closed request")
+    finally:
+        if not task.done():
+            task.cancel()
+
+async def run_hierarchical_summarization(
+    pdf_content: Optional[bytes],
+    document: Optional[ParsedDocument],
+    filename: str,
+    file_size_mb: float,
+    prompt: str,
+    enable_book_mode: bool,
+    chapter_detection: bool,
+    mode: str,
+    start_time: float,
+    progress: Optional[ProgressCallback] = None,
+    selection_strategy: Optional[str] = None,
+    embedding_backend: Optional[str] = None
+) -> Dict[str, Any]:
+    """Run the hierarchical pipeline on a resolved PDF input and build the endpoint response."""
+    # Log telemetry with enhanced metadata
+    await telemetry_service.log_query_event(prompt, "hierarchical_pdf_summarization", start_time, {
+        "file_size_mb": file_size_mb,
+        "filename": filename,
+        "staged_file": document is not None,
+        "book_mode_enabled": enable_book_mode,
+        "chapter_detection_enabled": chapter_detection,
+        "mode": mode,
+        "selection_strategy": selection_strategy,
+        "embedding_backend": embedding_backend
+    })
+    
+    # Customize prompt based on mode
+    mode_enhanced_prompt = customize_prompt_for_mode(prompt, mode)
+    
+    # Process document based on mode
+    if enable_book_mode:
+        print(f"Processing {filename} in book mode with mode: {mode}...")
+        result = await enhanced_pdf_service.process_large_book(
+            pdf_content, mode_enhanced_prompt, chapter_detection, document=document, progress=progress,
+            selection_strategy=selection_strategy, embedding_backend=embedding_backend
+        )
+    else:
+        print(f"Processing {filename} in standard hierarchical mode with mode: {mode}...")
+        result = await enhanced_pdf_service.process_document(
+            pdf_content, mode_enhanced_prompt, document=document, progress=progress,
+            selection_strategy=selection_strategy, embedding_backend=embedding_backend
+        )
+    
+    end_time = time.time()
+    total_processing_time = end_time - start_time
+    
+    # Generate detailed report
+    detailed_report = enhanced_pdf_service.generate_processing_report(result)
+    
+    # Log comprehensive performance metrics
+    await telemetry_service.log_performance_metrics({
+        "processing_time": total_processing_time,
+        "document_type": "pdf",
+        "processing_method": "hierarchical",
+        "file_size_mb": file_size_mb,
+        "book_mode": enable_book_mode,
+        "best_model": result.hierarchical_summary.best_model,
+        "best_similarity": result.hierarchical_summary.best_similarity,
+        "models_used": list(result.hierarchical_summary.model_results.keys()),
+        "word_count": result.document_metadata.get("word_count", 0),
+        "page_count": result.document_metadata.get("page_count", 0),
+        "extraction_stats": result.processing_stats.get("extraction_stats", {}),
+        "mode": mode,
+        "selection": result.processing_stats.get("selection", {})
+    })
+    
+    # Ensure hierarchical_summary is accessed correctly
+    hierarchical_summary = result.hierarchical_summary
+    if not isinstance(hierarchical_summary, HierarchicalSummaryResult):
+        raise HTTPException(status_code=500, detail="Invalid hierarchical summary result")
+    
+    # Prepare response
+    return {
+        "success": True,
+        "final_summary": hierarchical_summary.final_summary,
+        "best_model": hierarchical_summary.best_model,
+        "best_similarity_score": hierarchical_summary.best_similarity,
+        "processing_metadata": {
+            "total_processing_time": total_processing_time,
+            "document_analysis": result.document_metadata,
+            "processing_stats": result.processing_stats
+        },
+        "detailed_report": detailed_report,
+        "mode": mode
+    }
+
 @router.post("/hierarchical-summarize")
 async def hierarchical_summarize_pdf(
-    file: UploadFile = File(...),
+    http_request: Request,
     prompt: str = Form(...),
+    file: Optional[UploadFile] = File(None),
+    file_id: Optional[str] = Form(None),
     enable_book_mode: bool = Form(False),
     chapter_detection: bool = Form(False),
-    mode: str = Form("Auto Selection")
+    mode: str = Form("Auto Selection"),
+    selection_strategy: Optional[str] = Form(None),
+    embedding_backend: Optional[str] = Form(None)
 ):
     """
     Enhanced PDF summarization using Hierarchical Multi-LLM Recursive Summarizer.
@@ -190,112 +392,267 @@ async def hierarchical_summarize_pdf(
     - Map-reduce recursive summarization
     - Cosine similarity-based hallucination mitigation
     - Optimized for large documents (books, reports, etc.)
+    
+    Send either the PDF itself or the file_id returned by /upload-file; the latter
+    skips the second upload and reuses the text extracted in the background.
+    For long documents prefer POST /jobs/hierarchical-summarize, which returns immediately.
+    
+    selection_strategy: "all" (default) runs all four pipelines to completion, "cascade"
+    probes a few chunks per model and finishes only the best ones, "race" keeps the first
+    summary above the similarity threshold and cancels the rest.
+    
+    embedding_backend: "openai" or "local" (sentence-transformers on the server's CPU)
+    embeds the texts for similarity scoring; defaults to EMBEDDING_BACKEND.
     """
     start_time = time.time()
+    validate_selection_strategy(selection_strategy)
+    validate_embedding_backend(embedding_backend)
     
     try:
-        # Validate file type
-        if not file.filename.lower().endswith('.pdf'):
-            raise HTTPException(status_code=400, detail="Only PDF files are supported")
+        # Read PDF content, or reuse the document staged by /upload-file
+        pdf_content, document, filename, file_size_mb = await resolve_pdf_input(file, file_id)
         
-        # Read PDF content
-        pdf_content = await file.read()
-        file_size_mb = len(pdf_content) / (1024 * 1024)
+        return await run_until_disconnected(http_request, run_hierarchical_summarization(
+            pdf_content, document, filename, file_size_mb,
+            prompt, enable_book_mode, chapter_detection, mode, start_time,
+            selection_strategy=selection_strategy, embedding_backend=embedding_backend
+        ), "hierarchical_pdf_summarization")
         
-        # Log telemetry with enhanced metadata
-        await telemetry_service.log_query_event(prompt, "hierarchical_pdf_summarization", start_time, {
-            "file_size_mb": file_size_mb,
-            "filename": file.filename,
-            "book_mode_enabled": enable_book_mode,
-            "chapter_detection_enabled": chapter_detection,
-            "mode": mode
-        })
-        
-        # Customize prompt based on mode
-        mode_enhanced_prompt = customize_prompt_for_mode(prompt, mode)
-        
-        # Process document based on mode
-        if enable_book_mode:
-            print(f"Processing {file.filename} in book mode with mode: {mode}...")
-            result = await enhanced_pdf_service.process_large_book(
-                pdf_content, mode_enhanced_prompt, chapter_detection
+    except HTTPException:
+        raise
+    except Exception as e:
+        await telemetry_service.log_error_event("hierarchical_pdf_summarization", str(e))
+        raise HTTPException(status_code=500, detail=describe_hierarchical_error(e))
+
+async def stage_pdf_input(file: Optional[UploadFile], file_id: Optional[str]) -> StagedDocument:
+    """Resolve a request to a staged document, staging a direct upload so it outlives the request."""
+    if file_id:
+        staged = document_store.get(file_id)
+        if staged is None:
+            raise HTTPException(status_code=404, detail="Unknown or expired file_id. Please upload the file again.")
+        return staged
+    
+    if file is None:
+        raise HTTPException(status_code=400, detail="Either a PDF file or a file_id is required")
+    if not file.filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Only PDF files are supported")
+    
+    # The upload is closed once the request returns, so stage it for the background run to read
+    try:
+        staged = await document_store.stage_upload(file)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    document_store.start_extraction(staged)
+    return staged
+
+def make_hierarchical_runner(staged: StagedDocument, prompt: str, enable_book_mode: bool,
+                             chapter_detection: bool, mode: str,
+                             selection_strategy: Optional[str] = None,
+                             embedding_backend: Optional[str] = None) -> JobRunner:
+    """
+    Background hierarchical summarization of a staged PDF, reporting progress along the way.
+    
+    The runner holds `staged` itself rather than its file_id, and pins it while running,
+    so the upload's TTL cannot expire it from under a long run.
+    """
+    async def runner(progress: ProgressCallback) -> Dict[str, Any]:
+        start_time = time.time()
+        document_store.pin(staged)
+        try:
+            emit_progress(progress, "stage", stage="extracting")
+            document = await document_store.wait_for_document(staged)
+            return await run_hierarchical_summarization(
+                None, document, staged.filename, staged.size_mb,
+                prompt, enable_book_mode, chapter_detection, mode, start_time, progress, selection_strategy,
+                embedding_backend
             )
-        else:
-            print(f"Processing {file.filename} in standard hierarchical mode with mode: {mode}...")
-            result = await enhanced_pdf_service.process_document(pdf_content, mode_enhanced_prompt)
-        
-        end_time = time.time()
-        total_processing_time = end_time - start_time
-        
-        # Generate detailed report
-        detailed_report = enhanced_pdf_service.generate_processing_report(result)
-        
-        # Log comprehensive performance metrics
-        await telemetry_service.log_performance_metrics({
-            "processing_time": total_processing_time,
-            "document_type": "pdf",
-            "processing_method": "hierarchical",
-            "file_size_mb": file_size_mb,
-            "book_mode": enable_book_mode,
-            "best_model": result.hierarchical_summary.best_model,
-            "best_similarity": result.hierarchical_summary.best_similarity,
-            "models_used": list(result.hierarchical_summary.model_results.keys()),
-            "word_count": result.document_metadata.get("word_count", 0),
-            "page_count": result.document_metadata.get("page_count", 0),
-            "mode": mode
-        })
-        
-        # Debugging: Log the result type to ensure it's not a coroutine
-        print(f"Result type: {type(result)}")
+        except asyncio.CancelledError:
+            # Job cancelled or stream client disconnected
+            await telemetry_service.log_cancellation_event("hierarchical_pdf_summarization", {
+                "reason": "cancelled",
+                "file_id": staged.file_id,
+                "elapsed_seconds": time.time() - start_time
+            })
+            raise
+        except Exception as e:
+            await telemetry_service.log_error_event("hierarchical_pdf_summarization", str(e))
+            detail = e.detail if isinstance(e, HTTPException) else describe_hierarchical_error(e)
+            raise Exception(detail) from e
+        finally:
+            document_store.unpin(staged)
+    return runner
 
-        # Ensure the result is not a coroutine
-        if asyncio.iscoroutine(result):
-            raise HTTPException(status_code=500, detail="Unexpected coroutine result")
+@router.post("/hierarchical-summarize/stream")
+async def hierarchical_summarize_pdf_stream(
+    prompt: str = Form(...),
+    file: Optional[UploadFile] = File(None),
+    file_id: Optional[str] = Form(None),
+    enable_book_mode: bool = Form(False),
+    chapter_detection: bool = Form(False),
+    mode: str = Form("Auto Selection"),
+    selection_strategy: Optional[str] = Form(None),
+    embedding_backend: Optional[str] = Form(None)
+):
+    """
+    Server-sent-events variant of /hierarchical-summarize.
+    
+    Streams `stage`, `chunk_summary`, `merge_level` and `model_complete` events as
+    the model pipelines advance, then a final `result` event carrying the same
+    payload as /hierarchical-summarize (or an `error` event).
+    """
+    validate_selection_strategy(selection_strategy)
+    validate_embedding_backend(embedding_backend)
+    staged = await stage_pdf_input(file, file_id)
+    runner = make_hierarchical_runner(staged, prompt, enable_book_mode, chapter_detection, mode, selection_strategy,
+                                      embedding_backend)
+    return sse_response(stream_progress_events(runner))
 
-        # Ensure hierarchical_summary is accessed correctly
-        hierarchical_summary = result.hierarchical_summary
-        if not isinstance(hierarchical_summary, HierarchicalSummaryResult):
-            raise HTTPException(status_code=500, detail="Invalid hierarchical summary result")
+@router.post("/jobs/hierarchical-summarize", status_code=202)
+async def submit_hierarchical_summarize_job(
+    prompt: str = Form(...),
+    file: Optional[UploadFile] = File(None),
+    file_id: Optional[str] = Form(None),
+    enable_book_mode: bool = Form(False),
+    chapter_detection: bool = Form(False),
+    mode: str = Form("Auto Selection"),
+    selection_strategy: Optional[str] = Form(None),
+    embedding_backend: Optional[str] = Form(None)
+):
+    """
+    Queue a hierarchical summarization and return its job ID immediately.
+    
+    Poll GET /jobs/{job_id} for per-model progress and fetch the response of
+    /hierarchical-summarize from GET /jobs/{job_id}/result once it completes.
+    """
+    validate_selection_strategy(selection_strategy)
+    validate_embedding_backend(embedding_backend)
+    staged = await stage_pdf_input(file, file_id)
+    runner = make_hierarchical_runner(staged, prompt, enable_book_mode, chapter_detection, mode, selection_strategy,
+                                      embedding_backend)
+    
+    # Also pinned while queued; released however the job ends, including cancellation before it starts
+    document_store.pin(staged)
+    job = job_manager.submit("hierarchical-summarize", runner, {
+        "filename": staged.filename,
+        "file_id": staged.file_id,
+        "file_size_mb": staged.size_mb,
+        "book_mode_enabled": enable_book_mode,
+        "mode": mode,
+        "selection_strategy": selection_strategy,
+        "embedding_backend": embedding_backend
+    })
+    job.task.add_done_callback(lambda _: document_store.unpin(staged))
+    return {
+        "success": True,
+        "job_id": job.job_id,
+        "file_id": staged.file_id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.job_id}",
+        "result_url": f"/jobs/{job.job_id}/result"
+    }
 
-        # Prepare response
-        response_data = {
-            "success": True,
-            "final_summary": hierarchical_summary.final_summary,
-            "best_model": hierarchical_summary.best_model,
-            "best_similarity_score": hierarchical_summary.best_similarity,
-            "processing_metadata": {
-                "total_processing_time": total_processing_time,
-                "document_analysis": result.document_metadata,
-                "processing_stats": result.processing_stats
-            },
-            "detailed_report": detailed_report,
-            "mode": mode
-        }
-        
-        return response_data
-        
-    except Exception as e:
-        await telemetry_service.log_error_event("hierarchical_pdf_summarization", str(e))
-        
-        # Provide more specific error messages
-        error_message = str(e)
-        if "API key" in error_message.lower() or "authentication" in error_message.lower():
-            error_message = "API key configuration error. Please check your environment variables."
-        elif "timeout" in error_message.lower():
-            error_message = "Request timed out. The document might be too large. Try with a smaller PDF."
-        elif "network" in error_message.lower() or "connection" in error_message.lower():
-            error_message = "Network connection error. Please check your internet connection."
-        elif "memory" in error_message.lower():
-            error_message = "Memory limit exceeded. Please try with a smaller document."
-        else:
-            error_message = f"Error processing PDF: {str(e)}"
-        
-        raise HTTPException(status_code=500, detail=error_message)
+@router.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Status and per-model, per-stage progress of a summarization job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job_id")
+    return job.to_status()
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Result of a completed job; 409 while it is still queued or running."""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job_id")
+    if job.status == JOB_FAILED:
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status == JOB_CANCELLED:
+        raise HTTPException(status_code=410, detail="Job was cancelled")
+    if job.status != JOB_COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return job.result
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job."""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job_id")
+    return job.to_status()
+
+def validate_quick_text(text: str):
+    if not text.strip():
+        raise HTTPException(status_code=400, detail="Text content cannot be empty")
+    
+    if len(text) > 2000000:  # 2M characters limit
+        raise HTTPException(status_code=400, detail="Text too long. Maximum 2M characters.")
+
+async def run_quick_hierarchical_summarization(text: str, prompt: str, start_time: float,
+                                               progress: Optional[ProgressCallback] = None,
+                                               selection_strategy: Optional[str] = None,
+                                               embedding_backend: Optional[str] = None) -> Dict[str, Any]:
+    """Run the hierarchical summarizer on raw text and build the endpoint response."""
+    # Log telemetry
+    await telemetry_service.log_query_event(prompt, "quick_hierarchical_text", start_time, {
+        "text_length": len(text),
+        "word_count": len(text.split()),
+        "selection_strategy": selection_strategy,
+        "embedding_backend": embedding_backend
+    })
+    
+    # Process with hierarchical summarizer
+    result = await hierarchical_summarizer.summarize_document(text, prompt, progress=progress,
+                                                              strategy=selection_strategy,
+                                                              embedding_backend=embedding_backend)
+    
+    end_time = time.time()
+    processing_time = end_time - start_time
+    
+    # Log performance
+    await telemetry_service.log_performance_metrics({
+        "processing_time": processing_time,
+        "document_type": "text",
+        "processing_method": "hierarchical",
+        "text_length": len(text),
+        "word_count": len(text.split()),
+        "best_model": result.best_model,
+        "best_similarity": result.best_similarity,
+        "selection": result.processing_metadata.get("selection", {})
+    })
+    
+    # Generate detailed report
+    detailed_report = hierarchical_summarizer.get_detailed_report(result)
+    
+    return {
+        "success": True,
+        "final_summary": result.final_summary,
+        "best_model": result.best_model,
+        "best_similarity_score": result.best_similarity,
+        "processing_time": processing_time,
+        "model_results": {
+            model: {
+                "summary": res.summary,
+                "final_similarity": res.final_similarity,
+                "chunks_processed": res.chunks_processed,
+                "processing_time": res.processing_time,
+                "llm_calls": res.llm_calls,
+                "status": res.status,
+                "error": res.error
+            }
+            for model, res in result.model_results.items()
+        },
+        "processing_metadata": result.processing_metadata,
+        "detailed_report": detailed_report
+    }
 
 @router.post("/quick-hierarchical-summarize")
 async def quick_hierarchical_summarize(
+    http_request: Request,
     text: str = Form(...),
-    prompt: str = Form(...)
+    prompt: str = Form(...),
+    selection_strategy: Optional[str] = Form(None),
+    embedding_backend: Optional[str] = Form(None)
 ):
     """
     Quick hierarchical summarization for text input (without PDF processing).
@@ -305,62 +662,49 @@ async def quick_hierarchical_summarize(
     
     try:
         # Validate input
-        if not text.strip():
-            raise HTTPException(status_code=400, detail="Text content cannot be empty")
-        
-        if len(text) > 2000000:  # 2M characters limit
-            raise HTTPException(status_code=400, detail="Text too long. Maximum 2M characters.")
-        
-        # Log telemetry
-        await telemetry_service.log_query_event(prompt, "quick_hierarchical_text", start_time, {
-            "text_length": len(text),
-            "word_count": len(text.split())
-        })
+        validate_quick_text(text)
+        validate_selection_strategy(selection_strategy)
+        validate_embedding_backend(embedding_backend)
         
-        # Process with hierarchical summarizer
-        result = await hierarchical_summarizer.summarize_document(text, prompt)
-        
-        end_time = time.time()
-        processing_time = end_time - start_time
-        
-        # Log performance
-        await telemetry_service.log_performance_metrics({
-            "processing_time": processing_time,
-            "document_type": "text",
-            "processing_method": "hierarchical",
-            "text_length": len(text),
-            "word_count": len(text.split()),
-            "best_model": result.best_model,
-            "best_similarity": result.best_similarity
-        })
-        
-        # Generate detailed report
-        detailed_report = hierarchical_summarizer.get_detailed_report(result)
-        
-        return JSONResponse(content={
-            "success": True,
-            "final_summary": result.final_summary,
-            "best_model": result.best_model,
-            "best_similarity_score": result.best_similarity,
-            "processing_time": processing_time,
-            "model_results": {
-                model: {
-                    "summary": res.summary,
-                    "final_similarity": res.final_similarity,
-                    "chunks_processed": res.chunks_processed,
-                    "processing_time": res.processing_time,
-                    "error": res.error
-                }
-                for model, res in result.model_results.items()
-            },
-            "processing_metadata": result.processing_metadata,
-            "detailed_report": detailed_report
-        })
+        return JSONResponse(content=await run_until_disconnected(http_request, run_quick_hierarchical_summarization(
+            text, prompt, start_time, selection_strategy=selection_strategy, embedding_backend=embedding_backend
+        ), "quick_hierarchical_text"))
         
+    except HTTPException:
+        raise
     except Exception as e:
         await telemetry_service.log_error_event("quick_hierarchical_text", str(e))
         raise HTTPException(status_code=500, detail=f"Error processing text: {str(e)}")
 
+@router.post("/quick-hierarchical-summarize/stream")
+async def quick_hierarchical_summarize_stream(
+    text: str = Form(...),
+    prompt: str = Form(...),
+    selection_strategy: Optional[str] = Form(None),
+    embedding_backend: Optional[str] = Form(None)
+):
+    """Server-sent-events variant of /quick-hierarchical-summarize (same events as /hierarchical-summarize/stream)."""
+    validate_quick_text(text)
+    validate_selection_strategy(selection_strategy)
+    validate_embedding_backend(embedding_backend)
+    
+    async def runner(progress: ProgressCallback) -> Dict[str, Any]:
+        start_time = time.time()
+        try:
+            return await run_quick_hierarchical_summarization(text, prompt, start_time, progress, selection_strategy,
+                                                            embedding_backend)
+        except asyncio.CancelledError:
+            await telemetry_service.log_cancellation_event("quick_hierarchical_text", {
+                "reason": "client_disconnected",
+                "elapsed_seconds": time.time() - start_time
+            })
+            raise
+        except Exception as e:
+            await telemetry_service.log_error_event("quick_hierarchical_text", str(e))
+            raise Exception(f"Error processing text: {str(e)}") from e
+    
+    return sse_response(stream_progress_events(runner))
+
 @router.get("/system-status")
 async def get_system_status():
     """Get the status of the hierarchical summarization system."""
@@ -403,6 +747,8 @@ async def get_system_status():
                 "Book-length document processing",
                 "Model-specific optimization"
             ],
+            "rate_limits": rate_limiter.stats(),
+            "cancellations": dict(telemetry_service.cancellations),
             "max_document_size": "2M tokens (varies by model)",
             "optimal_for": "Large documents, books, comprehensive reports"
         })
@@ -413,6 +759,18 @@ async def get_system_status():
             content={"system_status": "error", "error": str(e)}
         )
 
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """Hit/miss/eviction counters and memory usage of the in-process caches, plus the job queue."""
+    return JSONResponse(content={
+        "semantic_chunker": hierarchical_summarizer.semantic_chunker.get_cache_stats(),
+        "extraction_cache": extraction_cache.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "embedding_backends": embedding_backend_stats(),
+        "document_store": document_store.stats(),
+        "jobs": job_manager.stats()
+    })
+
 @router.post("/chat")
 async def chat_with_gpt35(request: QueryRequest):
     """
@@ -453,11 +811,57 @@ async def chat_with_gpt35(request: QueryRequest):
         await telemetry_service.log_error("gpt35_chat", str(e))
         raise HTTPException(status_code=500, detail=f"Chat processing failed: {str(e)}")
 
+@router.post("/chat/stream")
+async def chat_with_gpt35_stream(request: QueryRequest):
+    """
+    Streaming variant of /chat: forwards GPT-3.5 Turbo tokens as server-sent events.
+    
+    Emits `token` events ({"text": ...}) as the completion is generated, then a
+    `done` event with timing (including time to first token) or an `error` event.
+    """
+    from app.services.llm_service import stream_openai_response
+    
+    start_time = time.time()
+    await telemetry_service.log_query_event(request.prompt, "gpt35_chat_stream", start_time)
+    
+    async def events():
+        first_token_time = None
+        response_length = 0
+        try:
+            async for delta in stream_openai_response(request.prompt):
+                if first_token_time is None:
+                    first_token_time = time.time()
+                response_length += len(delta)
+                yield sse_event("token", {"text": delta})
+            
+            end_time = time.time()
+            time_to_first_token = (first_token_time or end_time) - start_time
+            metrics = {
+                "processing_time": end_time - start_time,
+                "time_to_first_token": time_to_first_token,
+                "model": "openai",
+                "query_type": "text_only",
+                "streaming": True,
+                "response_length": response_length
+            }
+            await telemetry_service.log_performance_metrics(metrics)
+            yield sse_event("done", metrics)
+            
+        except Exception as e:
+            await telemetry_service.log_error("gpt35_chat_stream", str(e), {
+                "time_to_first_token": first_token_time - start_time if first_token_time else None,
+                "response_length": response_length
+            })
+            yield sse_event("error", {"detail": f"Chat processing failed: {str(e)}"})
+    
+    return sse_response(events())
+
 @router.post("/upload-file")
 async def upload_file(file: UploadFile = File(...)):
     """
-    Upload a file for processing. This endpoint validates the file and returns a file ID.
-    The actual processing is done by the hierarchical-summarize endpoint.
+    Upload a file for processing. The file is streamed to the staging directory and
+    text extraction starts in the background; the returned file ID can be passed to
+    the summarize endpoints instead of uploading the PDF again.
     """
     try:
         print(f"Upload request received for file: {file.filename}")
@@ -467,23 +871,22 @@ async def upload_file(file: UploadFile = File(...)):
             print(f"Invalid file type: {file.filename}")
             raise HTTPException(status_code=400, detail="Only PDF files are supported")
         
-        # Validate file size (max 50MB)
-        file_size = 0
-        content = await file.read()
-        file_size = len(content)
+        # Stream to disk in chunks; the size limit is enforced while streaming
+        try:
+            staged = await document_store.stage_upload(file)
+        except UploadTooLargeError as e:
+            print(f"File too large: {file.filename}")
+            raise HTTPException(status_code=413, detail=str(e))
         
-        print(f"File size: {file_size} bytes ({file_size / (1024 * 1024):.2f} MB)")
-        
-        if file_size > 50 * 1024 * 1024:  # 50MB limit
-            print(f"File too large: {file_size / (1024 * 1024):.2f} MB")
-            raise HTTPException(status_code=413, detail="File size must be less than 50MB")
-        
-        # Generate a unique file ID (in a real app, you'd store this in a database)
-        import uuid
-        file_id = str(uuid.uuid4())
+        file_id = staged.file_id
+        file_size = staged.size_bytes
         
+        print(f"File size: {file_size} bytes ({file_size / (1024 * 1024):.2f} MB)")
         print(f"Generated file ID: {file_id}")
         
+        # Start text extraction now so it overlaps with the user writing their prompt
+        document_store.start_extraction(staged)
+        
         # Log the upload
         await telemetry_service.log_query_event(
             f"File upload: {file.filename}", 
@@ -501,6 +904,7 @@ async def upload_file(file: UploadFile = File(...)):
             "file_id": file_id,
             "filename": file.filename,
             "file_size_mb": file_size / (1024 * 1024),
+            "extraction_status": staged.extraction_status,
             "message": "File uploaded successfully"
         }
         
@@ -0,0 +1,61 @@
+import json
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict
+
+from fastapi.responses import StreamingResponse
+
+from app.config import SSE_HEARTBEAT_SECONDS
+from app.services.hierarchical_summarizer import ProgressCallback
+
+# Headers that keep proxies (nginx, ngrok) from buffering the event stream
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no"
+}
+
+
+def sse_event(event_type: str, data: Any) -> str:
+    """Format one server-sent event."""
+    return f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+async def stream_progress_events(runner: Callable[[ProgressCallback], Awaitable[Dict[str, Any]]]) -> AsyncIterator[str]:
+    """
+    Run `runner` in the background and stream its progress events as SSE.
+
+    Every progress event is forwarded as it happens, followed by a final
+    `result` event (the runner's return value) or an `error` event. A comment
+    line is sent every SSE_HEARTBEAT_SECONDS of silence so idle connections
+    are not closed by proxies. If the client disconnects, the run is cancelled.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def progress(event_type: str, data: Dict[str, Any]):
+        queue.put_nowait((event_type, data))
+
+    task = asyncio.create_task(runner(progress))
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if item is None:
+                break
+            yield sse_event(*item)
+
+        try:
+            yield sse_event("result", task.result())
+        except Exception as e:
+            yield sse_event("error", {"detail": getattr(e, "detail", str(e))})
+    finally:
+        if not task.done():
+            task.cancel()
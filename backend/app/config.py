@@ -61,9 +61,111 @@ LLM_MODELS = {
 EMBEDDING_MODEL = "text-embedding-ada-002"
 EMBEDDING_MAX_TOKENS = 8000
 EMBEDDING_BATCH_SIZE = 100
+EMBEDDING_COALESCE_WINDOW_MS = float(os.environ.get("EMBEDDING_COALESCE_WINDOW_MS", "10"))  # Merge concurrent requests
+EMBEDDING_MAX_CONCURRENT_BATCHES = int(os.environ.get("EMBEDDING_MAX_CONCURRENT_BATCHES", "4"))  # Requests in flight
+
+# Embedding cache: in-memory LRU over an on-disk float32 matrix, keyed by SHA-256 of model + text
+EMBEDDING_CACHE_ENABLED = os.environ.get("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_DIR = os.environ.get("EMBEDDING_CACHE_DIR", "embedding_cache")
+EMBEDDING_CACHE_MEMORY_MB = int(os.environ.get("EMBEDDING_CACHE_MEMORY_MB", "64"))
+EMBEDDING_CACHE_MAX_MB = int(os.environ.get("EMBEDDING_CACHE_MAX_MB", "1024"))
+
+# Embedding backend for similarity scoring: "openai" (remote API) or "local" (sentence-transformers on the CPU).
+# Endpoints can override it per request; scores of different backends are not comparable with each other.
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "openai").lower()
+LOCAL_EMBEDDING_MODEL = os.environ.get("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+# torch intra-op threads for local embeddings; process-wide, so 0 (default) leaves torch's own setting
+LOCAL_EMBEDDING_THREADS = int(os.environ.get("LOCAL_EMBEDDING_THREADS", "0"))
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.environ.get("LOCAL_EMBEDDING_BATCH_SIZE", "32"))
+LOCAL_EMBEDDING_ACCELERATION = os.environ.get("LOCAL_EMBEDDING_ACCELERATION", "none").lower()  # none, int8 or onnx
 
 # Retry Settings - More conservative for Claude and Gemini
 RETRY_ATTEMPTS = 2
 RETRY_MULTIPLIER = 2
 RETRY_MIN = 2
-RETRY_MAX = 8 
\ No newline at end of file
+RETRY_MAX = 8 
+
+# Semantic chunker cache limits (per process)
+CHUNKER_SENTENCE_CACHE_MB = int(os.environ.get("CHUNKER_SENTENCE_CACHE_MB", "128"))
+CHUNKER_TOKEN_CACHE_MB = int(os.environ.get("CHUNKER_TOKEN_CACHE_MB", "64"))
+CHUNKER_CHUNK_CACHE_MB = int(os.environ.get("CHUNKER_CHUNK_CACHE_MB", "256"))
+CHUNKER_CACHE_TTL_SECONDS = int(os.environ.get("CHUNKER_CACHE_TTL_SECONDS", "3600"))
+
+# Threads used to count sentence tokens in parallel (tiktoken releases the GIL while encoding)
+TOKENIZER_THREADS = int(os.environ.get("TOKENIZER_THREADS", "8"))
+
+# PDF text extraction: worker processes and the page count below which extraction stays in-process
+PDF_EXTRACTION_WORKERS = int(os.environ.get("PDF_EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", "16"))
+
+# Streaming OCR: parallel tesseract workers, pages per window, and the per-page raster budget
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", str(os.cpu_count() or 1)))
+OCR_WINDOW_PAGES = int(os.environ.get("OCR_WINDOW_PAGES", str(2 * OCR_WORKERS)))
+OCR_DPI = int(os.environ.get("OCR_DPI", "300"))
+OCR_MIN_DPI = int(os.environ.get("OCR_MIN_DPI", "150"))
+OCR_MAX_PAGE_PIXELS = int(os.environ.get("OCR_MAX_PAGE_PIXELS", "9000000"))  # ~US Letter at 300 DPI
+
+# On-disk extraction cache keyed by SHA-256 of the uploaded PDF
+EXTRACTION_CACHE_ENABLED = os.environ.get("EXTRACTION_CACHE_ENABLED", "true").lower() == "true"
+EXTRACTION_CACHE_DIR = os.environ.get("EXTRACTION_CACHE_DIR", "extraction_cache")
+EXTRACTION_CACHE_MAX_MB = int(os.environ.get("EXTRACTION_CACHE_MAX_MB", "1024"))
+
+# Staged uploads: /upload-file streams PDFs here and starts extraction in the background.
+# Each worker process uses its own worker-<pid> subdirectory; file_ids only resolve in the worker that staged them.
+UPLOAD_STAGING_DIR = os.environ.get("UPLOAD_STAGING_DIR", "staged_uploads")
+UPLOAD_MAX_MB = int(os.environ.get("UPLOAD_MAX_MB", "50"))
+UPLOAD_CHUNK_BYTES = int(os.environ.get("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+UPLOAD_TTL_SECONDS = int(os.environ.get("UPLOAD_TTL_SECONDS", "3600"))
+
+# Background summarization jobs: concurrently running jobs and how long finished results are kept
+JOB_MAX_CONCURRENT = int(os.environ.get("JOB_MAX_CONCURRENT", "2"))
+JOB_RESULT_TTL_SECONDS = int(os.environ.get("JOB_RESULT_TTL_SECONDS", "3600"))
+
+# Server-sent events: idle seconds between keep-alive comments
+SSE_HEARTBEAT_SECONDS = int(os.environ.get("SSE_HEARTBEAT_SECONDS", "15"))
+
+# How often synchronous summarize endpoints check whether the client is still connected
+DISCONNECT_POLL_SECONDS = float(os.environ.get("DISCONNECT_POLL_SECONDS", "1"))
+
+# Per-provider request scheduling: requests/min, tokens/min and the most concurrent requests.
+# Set these to your account tier; chunk token counts are charged against tokens_per_minute.
+PROVIDER_RATE_LIMITS = {
+    "openai": {
+        "requests_per_minute": int(os.environ.get("OPENAI_RPM", "500")),
+        "tokens_per_minute": int(os.environ.get("OPENAI_TPM", "160000")),
+        "max_in_flight": int(os.environ.get("OPENAI_MAX_IN_FLIGHT", "8")),
+    },
+    "claude": {
+        "requests_per_minute": int(os.environ.get("CLAUDE_RPM", "50")),
+        "tokens_per_minute": int(os.environ.get("CLAUDE_TPM", "50000")),
+        "max_in_flight": int(os.environ.get("CLAUDE_MAX_IN_FLIGHT", "4")),
+    },
+    "gemini": {
+        "requests_per_minute": int(os.environ.get("GEMINI_RPM", "150")),
+        "tokens_per_minute": int(os.environ.get("GEMINI_TPM", "2000000")),
+        "max_in_flight": int(os.environ.get("GEMINI_MAX_IN_FLIGHT", "16")),
+    },
+    "mistral": {
+        "requests_per_minute": int(os.environ.get("MISTRAL_RPM", "60")),
+        "tokens_per_minute": int(os.environ.get("MISTRAL_TPM", "2000000")),
+        "max_in_flight": int(os.environ.get("MISTRAL_MAX_IN_FLIGHT", "8")),
+    },
+}
+# Pause after a 429 (doubles on consecutive 429s) and how often a rate-limited chunk is re-queued
+RATE_LIMIT_COOLDOWN_MIN = float(os.environ.get("RATE_LIMIT_COOLDOWN_MIN", "2"))
+RATE_LIMIT_COOLDOWN_MAX = float(os.environ.get("RATE_LIMIT_COOLDOWN_MAX", "60"))
+RATE_LIMIT_MAX_REQUEUES = int(os.environ.get("RATE_LIMIT_MAX_REQUEUES", "3"))
+
+# Process-wide async LLM clients: keep-alive connection pool size and request timeout.
+# Gemini calls share genai's single multiplexed gRPC channel, which has no pool to size;
+# their concurrency is capped by PROVIDER_RATE_LIMITS["gemini"]["max_in_flight"].
+MISTRAL_MAX_CONNECTIONS = int(os.environ.get("MISTRAL_MAX_CONNECTIONS",
+                                             str(PROVIDER_RATE_LIMITS["mistral"]["max_in_flight"])))
+MISTRAL_TIMEOUT_SECONDS = int(os.environ.get("MISTRAL_TIMEOUT_SECONDS", "120"))
+
+# Model selection: "all" runs every pipeline to completion, "cascade" probes a few chunks per model
+# and continues only the CASCADE_TOP_K best, "race" stops at the first summary above the threshold
+SELECTION_STRATEGY = os.environ.get("SELECTION_STRATEGY", "all").lower()
+CASCADE_PROBE_CHUNKS = int(os.environ.get("CASCADE_PROBE_CHUNKS", "3"))
+CASCADE_TOP_K = int(os.environ.get("CASCADE_TOP_K", "2"))
+RACE_SIMILARITY_THRESHOLD = float(os.environ.get("RACE_SIMILARITY_THRESHOLD", "0.8"))
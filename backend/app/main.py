@@ -8,6 +8,8 @@ from app.config import (
     CORS_METHODS, CORS_HEADERS
 )
 from app.services.telemetry_service import telemetry
+from app.services.pdf_service import shutdown_extraction_pool
+from app.services.llm_service import close_llm_clients
 import logging
 
 # Configure logging
@@ -21,6 +23,8 @@ async def lifespan(app: FastAPI):
     logging.info("Application startup")
     yield
     # Shutdown (if needed)
+    shutdown_extraction_pool()
+    await close_llm_clients()
     logging.info("Application shutdown")
 
 # Initialize FastAPI app=
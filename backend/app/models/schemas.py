@@ -3,6 +3,7 @@ from typing import Dict, List, Any, Optional
 
 class QueryRequest(BaseModel):
     prompt: str
+    embedding_backend: Optional[str] = None  # "openai" or "local"; defaults to EMBEDDING_BACKEND
 
 class QueryResponse(BaseModel):
     best_response: str
@@ -0,0 +1,223 @@
+import os
+import time
+import uuid
+import asyncio
+import hashlib
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import aiofiles
+from fastapi import UploadFile
+
+from app.config import UPLOAD_STAGING_DIR, UPLOAD_MAX_MB, UPLOAD_CHUNK_BYTES, UPLOAD_TTL_SECONDS
+from app.services.pdf_service import PDFService, ParsedDocument
+
+
+class UploadTooLargeError(Exception):
+    """Raised while streaming an upload that exceeds the size limit."""
+
+
+@dataclass
+class StagedDocument:
+    """A PDF written to the staging directory, plus its background extraction."""
+    file_id: str
+    filename: str
+    path: Path
+    size_bytes: int
+    sha256: str
+    created_at: float
+    extraction_task: Optional[asyncio.Task] = None
+    pins: int = 0  # Unfinished jobs using this upload; pinned documents never expire
+
+    @property
+    def size_mb(self) -> float:
+        return self.size_bytes / (1024 * 1024)
+
+    @property
+    def extraction_status(self) -> str:
+        task = self.extraction_task
+        if task is None:
+            return "pending"
+        if not task.done():
+            return "running"
+        if task.cancelled() or task.exception() is not None:
+            return "failed"
+        return "completed"
+
+
+class DocumentStore:
+    """
+    Staged uploads addressed by file_id.
+
+    /upload-file streams the PDF to disk in fixed-size chunks (hashing and
+    enforcing the size limit as it goes) and immediately starts text extraction
+    in the background. Summarize endpoints then pass the file_id and await the
+    already-running extraction instead of re-uploading and re-parsing the PDF.
+    Staged files are deleted after ttl_seconds.
+
+    The file_id registry is in memory, so a file_id only resolves in the worker
+    process that staged it: run the API as a single worker (or with sticky
+    sessions). Each process stages into its own worker-<pid> subdirectory of
+    staging_dir and only ever deletes files there. Background jobs pin the
+    documents they use so pruning cannot delete them mid-queue or mid-run.
+    """
+
+    def __init__(self, staging_dir: str = UPLOAD_STAGING_DIR, max_bytes: int = UPLOAD_MAX_MB * 1024 * 1024,
+                 chunk_bytes: int = UPLOAD_CHUNK_BYTES, ttl_seconds: int = UPLOAD_TTL_SECONDS,
+                 pdf_service: Optional[PDFService] = None):
+        self.staging_root = Path(staging_dir)
+        self.staging_dir = self.staging_root / f"worker-{os.getpid()}"
+        self.max_bytes = max_bytes
+        self.chunk_bytes = chunk_bytes
+        self.ttl_seconds = ttl_seconds
+        self.pdf_service = pdf_service or PDFService()
+        self._documents: Dict[str, StagedDocument] = {}
+
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        self._remove_orphaned_uploads()
+
+    def _remove_orphaned_uploads(self):
+        """
+        Delete staged PDFs no live registry can reach: our own directory's (left by an
+        earlier process with the same pid) and those of worker directories whose process
+        has exited. Nothing outside worker-<pid>/*.pdf is touched.
+        """
+        for directory in self.staging_root.glob("worker-*"):
+            pid = directory.name[len("worker-"):]
+            if not directory.is_dir() or not pid.isdigit():
+                continue
+            if directory != self.staging_dir and self._process_alive(int(pid)):
+                continue
+            for path in directory.glob("*.pdf"):
+                path.unlink(missing_ok=True)
+            if directory != self.staging_dir:
+                try:
+                    directory.rmdir()
+                except OSError:
+                    pass  # Not empty: holds files we did not create
+
+    @staticmethod
+    def _process_alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            return True  # Exists but belongs to another user
+        return True
+
+    async def stage_upload(self, upload: UploadFile) -> StagedDocument:
+        """Stream an upload to the staging directory without holding it in memory."""
+        self.prune_expired()
+
+        file_id = str(uuid.uuid4())
+        path = self.staging_dir / f"{file_id}.pdf"
+        digest = hashlib.sha256()
+        size = 0
+
+        try:
+            async with aiofiles.open(path, "wb") as f:
+                while True:
+                    chunk = await upload.read(self.chunk_bytes)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise UploadTooLargeError(
+                            f"File size must be less than {self.max_bytes // (1024 * 1024)}MB"
+                        )
+                    digest.update(chunk)
+                    await f.write(chunk)
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+
+        staged = StagedDocument(
+            file_id=file_id,
+            filename=upload.filename,
+            path=path,
+            size_bytes=size,
+            sha256=digest.hexdigest(),
+            created_at=time.time()
+        )
+        self._documents[file_id] = staged
+        return staged
+
+    def start_extraction(self, staged: StagedDocument) -> asyncio.Task:
+        """Begin parsing the staged PDF in the background (idempotent)."""
+        if staged.extraction_task is None:
+            staged.extraction_task = asyncio.create_task(self._extract(staged))
+            staged.extraction_task.add_done_callback(self._log_extraction_result)
+        return staged.extraction_task
+
+    async def _extract(self, staged: StagedDocument) -> ParsedDocument:
+        start_time = time.time()
+        pdf_content = await asyncio.to_thread(staged.path.read_bytes)
+        # The upload was hashed while streaming, so the extraction cache needs no second pass over the bytes
+        document = await self.pdf_service.load_document_async(pdf_content, cache_key=staged.sha256)
+        print(f"📄 Background extraction of {staged.filename} finished in {time.time() - start_time:.2f}s "
+              f"({document.page_count} pages)")
+        return document
+
+    @staticmethod
+    def _log_extraction_result(task: asyncio.Task):
+        # Retrieve the exception so failures are logged even if nobody awaits the document
+        if not task.cancelled() and task.exception() is not None:
+            print(f"❌ Background extraction failed: {str(task.exception())}")
+
+    def get(self, file_id: str) -> Optional[StagedDocument]:
+        staged = self._documents.get(file_id)
+        if staged is not None and self._is_expired(staged, time.time()):
+            self._remove(file_id)
+            return None
+        return staged
+
+    async def get_document(self, file_id: str) -> ParsedDocument:
+        """Parsed text of a staged upload, waiting for background extraction if it is still running."""
+        staged = self.get(file_id)
+        if staged is None:
+            raise KeyError(file_id)
+        return await self.wait_for_document(staged)
+
+    async def wait_for_document(self, staged: StagedDocument) -> ParsedDocument:
+        """Await the staged PDF's extraction, restarting it if an earlier attempt failed."""
+        if staged.extraction_status == "failed":
+            # Retry rather than replay a possibly transient error (pool breakage, OCR subprocess) until the TTL
+            staged.extraction_task = None
+        # Shield so a cancelled request does not abort extraction shared with other callers
+        return await asyncio.shield(self.start_extraction(staged))
+
+    def pin(self, staged: StagedDocument):
+        """Keep a staged document (file and extraction) alive until the matching unpin."""
+        staged.pins += 1
+
+    def unpin(self, staged: StagedDocument):
+        staged.pins = max(staged.pins - 1, 0)
+
+    def _is_expired(self, staged: StagedDocument, now: float) -> bool:
+        return staged.pins == 0 and now - staged.created_at > self.ttl_seconds
+
+    def _remove(self, file_id: str):
+        staged = self._documents.pop(file_id, None)
+        if staged is None:
+            return
+        if staged.extraction_task is not None and not staged.extraction_task.done():
+            staged.extraction_task.cancel()
+        staged.path.unlink(missing_ok=True)
+
+    def prune_expired(self) -> int:
+        now = time.time()
+        expired = [file_id for file_id, staged in self._documents.items() if self._is_expired(staged, now)]
+        for file_id in expired:
+            self._remove(file_id)
+        return len(expired)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "staged_documents": len(self._documents),
+            "staged_bytes": sum(staged.size_bytes for staged in self._documents.values()),
+            "pinned_documents": sum(1 for staged in self._documents.values() if staged.pins),
+            "extractions_running": sum(1 for staged in self._documents.values()
+                                       if staged.extraction_status == "running")
+        }
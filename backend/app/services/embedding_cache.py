@@ -0,0 +1,270 @@
+import json
+import re
+import asyncio
+import hashlib
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.config import (
+    EMBEDDING_CACHE_ENABLED, EMBEDDING_CACHE_DIR, EMBEDDING_CACHE_MEMORY_MB, EMBEDDING_CACHE_MAX_MB
+)
+from app.services.lru_cache import BoundedLRUCache
+
+try:
+    import fcntl
+    FILE_LOCKS_AVAILABLE = True
+except ImportError:
+    # Windows: no advisory locks, so a store must not be shared by several processes there
+    FILE_LOCKS_AVAILABLE = False
+
+# Bump when the on-disk layout changes; stores written by other versions are discarded
+CACHE_FORMAT_VERSION = 1
+
+EmbeddingFetcher = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+class EmbeddingStore:
+    """
+    Append-only on-disk embeddings of one model.
+
+    Vectors are rows of a float32 matrix (vectors.f32) that is read through a
+    memory map; index.tsv maps each key to its row. Both files are only ever
+    appended to, vector first, so a crash can at worst leave a row without an
+    index line, which is ignored on the next load.
+
+    Several worker processes may share a store: the row number of appended
+    vectors is derived from the file size, so it is computed and both appends
+    are done under an exclusive flock on the store's lock file.
+    """
+
+    def __init__(self, directory: Path, dimensions: int, max_rows: int):
+        self.directory = directory
+        self.dimensions = dimensions
+        self.max_rows = max_rows
+        self.vectors_path = directory / "vectors.f32"
+        self.index_path = directory / "index.tsv"
+        self.lock_path = directory / ".lock"
+        self.rows: Dict[str, int] = {}
+        self.stored_rows = 0  # Rows in vectors.f32, including those appended by other processes
+        self._map: Optional[np.memmap] = None
+        self._load()
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock on the store, held across processes."""
+        if not FILE_LOCKS_AVAILABLE:
+            yield
+            return
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._file_lock():
+            self._load_locked()
+
+    def _load_locked(self):
+        meta_path = self.directory / "meta.json"
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            meta = None
+        if meta != {"version": CACHE_FORMAT_VERSION, "dimensions": self.dimensions}:
+            # New, stale or unreadable store: start over
+            self.vectors_path.unlink(missing_ok=True)
+            self.index_path.unlink(missing_ok=True)
+            meta_path.write_text(json.dumps({"version": CACHE_FORMAT_VERSION, "dimensions": self.dimensions}))
+
+        row_bytes = self.dimensions * 4
+        stored_rows = self.vectors_path.stat().st_size // row_bytes if self.vectors_path.exists() else 0
+        if self.vectors_path.exists() and self.vectors_path.stat().st_size != stored_rows * row_bytes:
+            # Drop a partially written trailing row
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(stored_rows * row_bytes)
+
+        if self.index_path.exists():
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    key, _, row = line.strip().partition("\t")
+                    if row.isdigit() and int(row) < stored_rows:
+                        self.rows[key] = int(row)
+        self.stored_rows = stored_rows
+
+    def _matrix(self, row: int) -> np.memmap:
+        # The map is reopened once rows were appended past its end
+        if self._map is None or row >= self._map.shape[0]:
+            total_rows = self.vectors_path.stat().st_size // (self.dimensions * 4)
+            self._map = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(total_rows, self.dimensions))
+        return self._map
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        return np.array(self._matrix(row)[row])
+
+    @property
+    def full(self) -> bool:
+        return self.stored_rows >= self.max_rows
+
+    def add(self, items: Dict[str, np.ndarray]) -> int:
+        """Append vectors not stored yet. Returns how many were written."""
+        new_items = [(key, vector) for key, vector in items.items() if key not in self.rows]
+        if not new_items:
+            return 0
+
+        matrix = np.stack([vector for _, vector in new_items]).astype(np.float32, copy=False)
+        with self._file_lock():
+            # Other processes may have appended since we last looked: the file size decides the row
+            first_row = self.vectors_path.stat().st_size // (self.dimensions * 4) if self.vectors_path.exists() else 0
+            count = min(len(new_items), max(0, self.max_rows - first_row))
+            if count:
+                with open(self.vectors_path, "ab") as f:
+                    f.write(matrix[:count].tobytes())
+                with open(self.index_path, "a", encoding="utf-8") as f:
+                    f.write("".join(f"{key}\t{first_row + i}\n" for i, (key, _) in enumerate(new_items[:count])))
+            self.stored_rows = first_row + count
+        for i, (key, _) in enumerate(new_items[:count]):
+            self.rows[key] = first_row + i
+        return count
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache.
+
+    Embeddings are keyed by the SHA-256 of model + text. Lookups go to an
+    in-memory LRU first, then to the model's on-disk EmbeddingStore; only the
+    remaining misses (deduplicated) are sent to the embeddings API, in one
+    request per call. The disk store stops growing at max_bytes; vectors beyond
+    that are kept in memory only. Disk reads and writes run in worker threads,
+    off the event loop.
+    """
+
+    def __init__(self, cache_dir: str = EMBEDDING_CACHE_DIR, memory_bytes: int = EMBEDDING_CACHE_MEMORY_MB * 1024 * 1024,
+                 max_bytes: int = EMBEDDING_CACHE_MAX_MB * 1024 * 1024, enabled: bool = EMBEDDING_CACHE_ENABLED):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.memory = BoundedLRUCache("embeddings", memory_bytes)
+        self._stores: Dict[str, EmbeddingStore] = {}
+        self._lock = threading.Lock()
+
+        self.disk_hits = 0
+        self.api_texts = 0  # Texts actually sent to the embeddings API
+        self.deduplicated = 0  # Repeated texts within a batch that were embedded once
+
+    @staticmethod
+    def key_for(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+    def _store_for(self, model: str, dimensions: Optional[int] = None) -> Optional[EmbeddingStore]:
+        """The model's disk store; opened on first use, or created once the vector size is known."""
+        store = self._stores.get(model)
+        if store is not None or not self.enabled:
+            return store
+
+        directory = self.cache_dir / re.sub(r"[^A-Za-z0-9_.-]", "_", model)
+        if dimensions is None:
+            try:
+                dimensions = json.loads((directory / "meta.json").read_text())["dimensions"]
+            except (OSError, ValueError, KeyError):
+                return None
+        try:
+            store = EmbeddingStore(directory, dimensions, max_rows=max(1, self.max_bytes // (dimensions * 4)))
+        except OSError as e:
+            print(f"⚠️  Embedding cache disabled: could not open {directory}: {str(e)}")
+            self.enabled = False
+            return None
+        self._stores[model] = store
+        return store
+
+    def _lookup_disk(self, model: str, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Vectors of keys found in the model's disk store (blocking; runs in a worker thread)."""
+        with self._lock:
+            store = self._store_for(model)
+            if store is None:
+                return {}
+            found = {}
+            for key in keys:
+                vector = store.get(key)
+                if vector is not None:
+                    found[key] = vector
+            self.disk_hits += len(found)
+        for key, vector in found.items():
+            self.memory.put(key, vector)
+        return found
+
+    def _save_disk(self, model: str, items: Dict[str, np.ndarray]):
+        """Append new vectors to the model's disk store (blocking; runs in a worker thread)."""
+        with self._lock:
+            store = self._store_for(model, dimensions=len(next(iter(items.values()))))
+            if store is None:
+                return
+            was_full = store.full
+            try:
+                store.add(items)
+            except OSError as e:
+                print(f"⚠️  Could not write embedding cache for {model}: {str(e)}")
+                return
+            if store.full and not was_full:
+                print(f"⚠️  Embedding cache for {model} reached {self.max_bytes // (1024 * 1024)}MB; "
+                      f"new embeddings are kept in memory only")
+
+    async def get_or_compute(self, model: str, texts: List[str], fetch: EmbeddingFetcher) -> List[List[float]]:
+        """Embeddings for texts (in order), calling fetch once with the distinct texts not cached yet."""
+        keys = [self.key_for(model, text) for text in texts]
+        vectors: Dict[str, np.ndarray] = {}
+        missing: Dict[str, str] = {}  # key -> text, first occurrence only
+        for key, text in zip(keys, texts):
+            if key in vectors or key in missing:
+                continue
+            vector = self.memory.get(key)
+            if vector is None:
+                missing[key] = text
+            else:
+                vectors[key] = vector
+        self.deduplicated += len(texts) - len(vectors) - len(missing)
+
+        if missing and self.enabled:
+            found = await asyncio.to_thread(self._lookup_disk, model, list(missing))
+            vectors.update(found)
+            for key in found:
+                del missing[key]
+
+        if missing:
+            fetched = await fetch(list(missing.values()))
+            self.api_texts += len(missing)
+            new_vectors = {key: np.asarray(embedding, dtype=np.float32) for key, embedding in zip(missing, fetched)}
+            for key, vector in new_vectors.items():
+                self.memory.put(key, vector)
+            if self.enabled:
+                await asyncio.to_thread(self._save_disk, model, new_vectors)
+            vectors.update(new_vectors)
+
+        return [vectors[key].tolist() for key in keys]
+
+    def stats(self) -> Dict[str, Any]:
+        memory = self.memory.stats()
+        return {
+            "enabled": self.enabled,
+            "directory": str(self.cache_dir),
+            "memory": memory,
+            "disk_entries": {model: len(store.rows) for model, store in self._stores.items()},
+            "disk_hits": self.disk_hits,
+            "api_texts": self.api_texts,
+            "deduplicated": self.deduplicated,
+            "max_bytes": self.max_bytes,
+        }
+
+
+# Global embedding cache instance
+embedding_cache = EmbeddingCache()
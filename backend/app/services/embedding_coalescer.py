@@ -0,0 +1,86 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+EmbeddingFetcher = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+class EmbeddingCoalescer:
+    """
+    Merges concurrent embedding requests into one API call.
+
+    The first request opens a window of window_seconds; every request that
+    arrives before it closes (or until max_texts texts are waiting) is sent in
+    the same fetch, with repeated texts embedded once, and each caller gets
+    its own embeddings back. A failed fetch fails every request of the batch.
+    """
+
+    def __init__(self, fetch: EmbeddingFetcher, window_seconds: float, max_texts: int):
+        self.fetch = fetch
+        self.window_seconds = window_seconds
+        self.max_texts = max_texts
+        self._pending: List[Tuple[List[str], asyncio.Future]] = []
+        self._pending_texts = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._batches: set = set()  # Running fetch tasks, referenced until they finish
+
+        # Counters exposed through stats()
+        self.requests = 0
+        self.api_calls = 0
+        self.texts_sent = 0
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((texts, future))
+        self._pending_texts += len(texts)
+        self.requests += 1
+
+        if self._pending_texts >= self.max_texts:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_texts = self._pending, [], 0
+        # Callers cancelled while waiting for the window no longer need their texts
+        batch = [(texts, future) for texts, future in batch if not future.done()]
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run(self, batch: List[Tuple[List[str], asyncio.Future]]):
+        unique_texts = list(dict.fromkeys(text for texts, _ in batch for text in texts))
+        self.api_calls += 1
+        self.texts_sent += len(unique_texts)
+        try:
+            embeddings = await self.fetch(unique_texts)
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        by_text = dict(zip(unique_texts, embeddings))
+        for texts, future in batch:
+            if not future.done():
+                future.set_result([by_text[text] for text in texts])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_seconds": self.window_seconds,
+            "requests": self.requests,
+            "api_calls": self.api_calls,
+            "texts_sent": self.texts_sent,
+            "requests_per_call": self.requests / self.api_calls if self.api_calls else 0.0
+        }
@@ -1,13 +1,22 @@
+import time
 import asyncio
-from typing import List, Dict
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-import openai
+import threading
+import importlib.util
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Dict, Optional
 import tiktoken
-from app.config import OPENAI_API_KEY, EMBEDDING_MODEL, EMBEDDING_MAX_TOKENS, EMBEDDING_BATCH_SIZE
+from app.config import (
+    EMBEDDING_MODEL, EMBEDDING_MAX_TOKENS, EMBEDDING_BATCH_SIZE, EMBEDDING_COALESCE_WINDOW_MS,
+    EMBEDDING_MAX_CONCURRENT_BATCHES, EMBEDDING_BACKEND, LOCAL_EMBEDDING_MODEL, LOCAL_EMBEDDING_THREADS, LOCAL_EMBEDDING_BATCH_SIZE,
+    LOCAL_EMBEDDING_ACCELERATION
+)
+from app.services.embedding_cache import embedding_cache
+from app.services.embedding_coalescer import EmbeddingCoalescer
+from app.services.similarity import cosine_to_query
 
-# Initialize OpenAI client
-openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
+# Embeddings share the process-wide async OpenAI client (and its keep-alive pool) with the chat calls
+from app.services.llm_service import openai_client
 
 # Initialize tokenizer for token counting
 try:
@@ -37,43 +46,249 @@ def truncate_text_for_embedding(text: str, max_tokens: int = MAX_TOKENS_PER_REQU
     char_limit = max_tokens * 4  # Approximate 4 chars per token
     return text[:char_limit]
 
-async def get_embedding(text: str) -> List[float]:
-    """Get embedding for text using OpenAI's text-embedding-ada-002 model."""
+# Bounds the embedding requests in flight across all callers
+embedding_request_slots = asyncio.Semaphore(max(1, EMBEDDING_MAX_CONCURRENT_BATCHES))
+
+async def fetch_embedding_batch(batch: List[str]) -> List[List[float]]:
+    async with embedding_request_slots:
+        response = await openai_client.embeddings.create(model=EMBEDDING_MODEL, input=batch)
+    return [data.embedding for data in response.data]
+
+async def fetch_embeddings(texts: List[str]) -> List[List[float]]:
+    """
+    Call the embeddings API for already truncated texts, MAX_ITEMS_PER_BATCH per request.
+    The requests of a large input run concurrently, EMBEDDING_MAX_CONCURRENT_BATCHES at a time.
+    """
+    tasks = [
+        asyncio.create_task(fetch_embedding_batch(texts[i:i + MAX_ITEMS_PER_BATCH]))
+        for i in range(0, len(texts), MAX_ITEMS_PER_BATCH)
+    ]
     try:
-        # Truncate text if too long
-        truncated_text = truncate_text_for_embedding(text)
-        
-        response = await asyncio.to_thread(
-            openai_client.embeddings.create,
-            model=EMBEDDING_MODEL,
-            input=truncated_text
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        # One failed (or the caller was cancelled): the remaining batches are not needed
+        for task in tasks:
+            task.cancel()
+        raise
+    
+    return [embedding for batch_embeddings in results for embedding in batch_embeddings]
+
+class EmbeddingBackend(ABC):
+    """
+    A source of text embeddings for similarity scoring.
+
+    Callers go through embed(): texts are prepared (truncated) for the model,
+    served from the shared embedding cache where possible, and the misses of
+    concurrent callers are merged into one embed_texts() call.
+    """
+
+    name: str
+    model: str  # Cache namespace: vectors of different models never mix
+
+    def __init__(self, max_texts: int):
+        self.coalescer = EmbeddingCoalescer(
+            self.embed_texts,
+            window_seconds=EMBEDDING_COALESCE_WINDOW_MS / 1000,
+            max_texts=max_texts
         )
-        return response.data[0].embedding
+
+    @property
+    def available(self) -> bool:
+        """False when the backend's dependencies are missing."""
+        return True
+
+    async def prepare(self, texts: List[str]) -> List[str]:
+        """Texts as they are sent to the model (and hashed for the cache)."""
+        return texts
+
+    @abstractmethod
+    async def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """Embed already prepared, distinct texts; no caching."""
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        prepared = await self.prepare(texts)
+        return await embedding_cache.get_or_compute(self.model, prepared, self.coalescer.embed)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"model": self.model, "available": self.available, "coalescer": self.coalescer.stats()}
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """OpenAI embeddings API (text-embedding-ada-002)."""
+
+    name = "openai"
+    model = EMBEDDING_MODEL
+
+    def __init__(self):
+        # Cache misses of concurrent callers (e.g. the final-stage scoring of every model pipeline) share API calls
+        super().__init__(max_texts=MAX_ITEMS_PER_BATCH)
+
+    async def prepare(self, texts: List[str]) -> List[str]:
+        return [truncate_text_for_embedding(text) for text in texts]
+
+    async def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        return await fetch_embeddings(texts)
+
+
+# Texts are cut to the model's max_seq_length with its own tokenizer. To keep that cheap for whole
+# books, only the first max_seq_length * 32 characters are tokenized; text averaging more than 32
+# characters per token (e.g. long whitespace runs) is cut at that bound, a little before the model would.
+LOCAL_EMBEDDING_CHARS_PER_TOKEN = 32
+
+
+class LocalEmbeddingBackend(EmbeddingBackend):
+    """
+    sentence-transformers model running on the CPU, so scoring needs no API calls.
+
+    The model is loaded on first use. Inference runs on one dedicated thread
+    (torch parallelizes each batch over its intra-op threads itself), with
+    batches of batch_size texts and normalized output vectors. `threads` > 0
+    sets torch's thread count; that setting is process-wide, so it is opt-in. Acceleration "int8"
+    quantizes the linear layers dynamically; "onnx" runs the model through
+    ONNX Runtime where the installed sentence-transformers supports it.
+    """
+
+    name = "local"
+
+    def __init__(self, model: str = LOCAL_EMBEDDING_MODEL, threads: int = LOCAL_EMBEDDING_THREADS,
+                 batch_size: int = LOCAL_EMBEDDING_BATCH_SIZE, acceleration: str = LOCAL_EMBEDDING_ACCELERATION):
+        if acceleration not in ("none", "int8", "onnx"):
+            print(f"⚠️  Unknown local embedding acceleration '{acceleration}' (expected none, int8 or onnx); using none")
+            acceleration = "none"
+        self.model = f"local/{model}" if acceleration == "none" else f"local/{model}/{acceleration}"
+        self.model_name = model
+        self.threads = max(0, threads)  # 0 leaves torch's default alone
+        self.batch_size = max(1, batch_size)
+        self.acceleration = acceleration
+        self._encoder = None
+        self._load_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.texts_encoded = 0
+        self.encode_seconds = 0.0
+        super().__init__(max_texts=self.batch_size * 8)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="local-embeddings")
+        return self._executor
+
+    @property
+    def available(self) -> bool:
+        return importlib.util.find_spec("sentence_transformers") is not None
+
+    def _truncate(self, texts: List[str]) -> List[str]:
+        encoder = self._load()
+        tokenizer = encoder.tokenizer
+        max_tokens = encoder.max_seq_length - tokenizer.num_special_tokens_to_add()  # [CLS]/[SEP] count too
+        char_bound = encoder.max_seq_length * LOCAL_EMBEDDING_CHARS_PER_TOKEN
+        prepared = []
+        for text in texts:
+            prefix = text[:char_bound]
+            if not getattr(tokenizer, "is_fast", False):
+                prepared.append(prefix)  # Offsets need a fast tokenizer; the model truncates the rest itself
+                continue
+            offsets = tokenizer(prefix, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+            prepared.append(prefix[:offsets[max_tokens - 1][1]] if len(offsets) > max_tokens else prefix)
+        return prepared
+
+    async def prepare(self, texts: List[str]) -> List[str]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._truncate, texts)
+
+    def _load(self):
+        with self._load_lock:
+            if self._encoder is not None:
+                return self._encoder
+            try:
+                import torch
+                from sentence_transformers import SentenceTransformer
+            except ImportError:
+                raise RuntimeError("Local embeddings need sentence-transformers and torch "
+                                   "(pip install sentence-transformers)")
+
+            if self.threads:
+                torch.set_num_threads(self.threads)
+            encoder = None
+            if self.acceleration == "onnx":
+                try:
+                    encoder = SentenceTransformer(self.model_name, device="cpu", backend="onnx")
+                except (TypeError, ImportError, ValueError) as e:
+                    # backend= needs sentence-transformers >= 3.2 plus optimum/onnxruntime
+                    print(f"⚠️  ONNX embeddings unavailable ({str(e)}); using the PyTorch model")
+            if encoder is None:
+                encoder = SentenceTransformer(self.model_name, device="cpu")
+            if self.acceleration == "int8":
+                encoder = torch.quantization.quantize_dynamic(encoder, {torch.nn.Linear}, dtype=torch.qint8)
+            encoder.eval()
+
+            print(f"🧮 Loaded local embedding model {self.model_name} "
+                  f"({self.acceleration}, {torch.get_num_threads()} threads, batch {self.batch_size}, "
+                  f"{encoder.max_seq_length} tokens)")
+            self._encoder = encoder
+            return encoder
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        import torch
+
+        encoder = self._load()
+        start = time.perf_counter()
+        with torch.inference_mode():
+            vectors = encoder.encode(texts, batch_size=self.batch_size, convert_to_numpy=True,
+                                     normalize_embeddings=True, show_progress_bar=False)
+        self.encode_seconds += time.perf_counter() - start
+        self.texts_encoded += len(texts)
+        return vectors.tolist()
+
+    async def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._encode, texts)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats.update({
+            "loaded": self._encoder is not None,
+            "threads": self.threads or "torch default",
+            "batch_size": self.batch_size,
+            "acceleration": self.acceleration,
+            "texts_encoded": self.texts_encoded,
+            "texts_per_second": self.texts_encoded / self.encode_seconds if self.encode_seconds else 0.0
+        })
+        return stats
+
+
+# Global embedding backend instances, selectable per request by name
+embedding_backends: Dict[str, EmbeddingBackend] = {
+    "openai": OpenAIEmbeddingBackend(),
+    "local": LocalEmbeddingBackend(),
+}
+
+def get_embedding_backend(name: Optional[str] = None) -> EmbeddingBackend:
+    """The named backend, or the configured EMBEDDING_BACKEND when name is None."""
+    name = (name or EMBEDDING_BACKEND).lower()
+    if name not in embedding_backends:
+        raise ValueError(f"Unknown embedding backend '{name}'. Use one of: {', '.join(embedding_backends)}")
+    return embedding_backends[name]
+
+def embedding_backend_stats() -> Dict[str, Any]:
+    return {
+        "default": EMBEDDING_BACKEND,
+        "backends": {name: backend.stats() for name, backend in embedding_backends.items()}
+    }
+
+async def get_embedding(text: str, backend: Optional[str] = None) -> List[float]:
+    """Get embedding for text from the selected embedding backend (OpenAI's text-embedding-ada-002 by default)."""
+    try:
+        embeddings = await get_embedding_backend(backend).embed([text])
+        return embeddings[0]
     except Exception as e:
         raise Exception(f"Error getting embedding: {str(e)}")
 
-async def get_embeddings_batch(texts: List[str]) -> List[List[float]]:
-    """Get embeddings for multiple texts using OpenAI's text-embedding-ada-002 model."""
+async def get_embeddings_batch(texts: List[str], backend: Optional[str] = None) -> List[List[float]]:
+    """Get embeddings for multiple texts from the selected embedding backend."""
     try:
-        # Truncate all texts to prevent token limit errors
-        truncated_texts = [truncate_text_for_embedding(text) for text in texts]
-        
-        # Process in smaller batches if too many items
-        all_embeddings = []
-        
-        for i in range(0, len(truncated_texts), MAX_ITEMS_PER_BATCH):
-            batch = truncated_texts[i:i + MAX_ITEMS_PER_BATCH]
-            
-            response = await asyncio.to_thread(
-                openai_client.embeddings.create,
-                model=EMBEDDING_MODEL,
-                input=batch
-            )
-            
-            batch_embeddings = [data.embedding for data in response.data]
-            all_embeddings.extend(batch_embeddings)
-        
-        return all_embeddings
+        # Texts are truncated for the backend's model; cached and repeated texts are not embedded again
+        return await get_embedding_backend(backend).embed(texts)
         
     except Exception as e:
         raise Exception(f"Error getting batch embeddings: {str(e)}")
@@ -81,20 +296,13 @@ async def get_embeddings_batch(texts: List[str]) -> List[List[float]]:
 def calculate_cosine_similarities(query_embedding: List[float], response_embeddings: List[List[float]]) -> List[float]:
     """Calculate cosine similarities between query embedding and multiple response embeddings."""
     try:
-        similarities = []
-        query_array = np.array(query_embedding).reshape(1, -1)
-        
-        for response_embedding in response_embeddings:
-            response_array = np.array(response_embedding).reshape(1, -1)
-            similarity = cosine_similarity(query_array, response_array)[0][0]
-            similarities.append(float(similarity))
-        
-        return similarities
+        return cosine_to_query(query_embedding, response_embeddings).tolist()
     except Exception as e:
         # Return zeros if calculation fails
         return [0.0] * len(response_embeddings)
 
-async def calculate_similarities(query_embedding: List[float], responses: Dict[str, str]) -> Dict[str, float]:
+async def calculate_similarities(query_embedding: List[float], responses: Dict[str, str],
+                                 backend: Optional[str] = None) -> Dict[str, float]:
     """Calculate similarities between query embedding and response embeddings."""
     # Get valid responses
     valid_responses = {model: response for model, response in responses.items() 
@@ -109,15 +317,12 @@ async def calculate_similarities(query_embedding: List[float], responses: Dict[s
     try:
         # Get embeddings for valid responses
         response_texts = list(valid_responses.values())
-        response_embeddings = await get_embeddings_batch(response_texts)
+        response_embeddings = await get_embeddings_batch(response_texts, backend)
         
         # Calculate similarities
-        for (model, _), embedding in zip(valid_responses.items(), response_embeddings):
-            similarity = cosine_similarity(
-                np.array(query_embedding).reshape(1, -1),
-                np.array(embedding).reshape(1, -1)
-            )[0][0]
-            similarities[model] = similarity
+        scores = cosine_to_query(query_embedding, response_embeddings)
+        for model, similarity in zip(valid_responses, scores):
+            similarities[model] = float(similarity)
             
     except Exception as e:
         # If anything fails, set all valid responses to 0.0
@@ -1,12 +1,10 @@
-import io
 from typing import List, Dict, Any, Optional
 from pathlib import Path
-import PyPDF2
 from dataclasses import dataclass
 
 # Import existing PDF extraction capabilities
-from app.services.pdf_service import PDFService
-from app.services.hierarchical_summarizer import HierarchicalSummarizer, HierarchicalSummaryResult
+from app.services.pdf_service import PDFService, ParsedDocument
+from app.services.hierarchical_summarizer import HierarchicalSummarizer, HierarchicalSummaryResult, ProgressCallback, emit_progress
 
 @dataclass
 class BookProcessingResult:
@@ -29,23 +27,17 @@ class EnhancedPDFService:
         self.max_pages_warning = 100
         self.max_words_warning = 100000
     
-    def _analyze_document_complexity(self, text: str, pdf_content: bytes) -> Dict[str, Any]:
+    def _analyze_document_complexity(self, document: ParsedDocument) -> Dict[str, Any]:
         """Analyze the complexity and characteristics of the document."""
-        try:
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
-            page_count = len(pdf_reader.pages)
-        except:
-            page_count = 0
-        
-        word_count = len(text.split())
-        char_count = len(text)
+        page_count = document.page_count
+        word_count = document.word_count
+        char_count = document.character_count
         
         # Estimate reading time (average 200 words per minute)
         estimated_reading_time = word_count / 200
         
-        # Analyze text characteristics
-        lines = text.split('\n')
-        avg_line_length = sum(len(line) for line in lines) / max(len(lines), 1)
+        # Analyze text characteristics (line stats come from the single extraction pass)
+        avg_line_length = document.average_line_length
         
         # Detect document type based on patterns
         doc_type = "unknown"
@@ -74,7 +66,8 @@ class EnhancedPDFService:
             "average_line_length": avg_line_length,
             "document_type": doc_type,
             "complexity_score": complexity_score,
-            "processing_recommendations": self._get_processing_recommendations(page_count, word_count, complexity_score)
+            "processing_recommendations": self._get_processing_recommendations(page_count, word_count, complexity_score),
+            "extraction_methods": document.extraction_stats.get("pages_by_method", {})
         }
     
     def _get_processing_recommendations(self, page_count: int, word_count: int, complexity_score: int) -> List[str]:
@@ -109,15 +102,27 @@ class EnhancedPDFService:
         
         return context_enhanced_prompt
     
-    async def process_document(self, pdf_content: bytes, user_prompt: str) -> BookProcessingResult:
+    async def process_document(self, pdf_content: Optional[bytes], user_prompt: str,
+                               document: Optional[ParsedDocument] = None,
+                               progress: Optional[ProgressCallback] = None,
+                               selection_strategy: Optional[str] = None,
+                               embedding_backend: Optional[str] = None) -> BookProcessingResult:
+        """
+        Summarize a PDF. Pass an already parsed `document` (e.g. a staged upload) to skip extraction;
+        `selection_strategy` picks how model pipelines compete (see hierarchical_summarizer.SELECTION_STRATEGIES)
+        and `embedding_backend` which embedding backend scores them.
+        """
         import time
         start_time = time.time()
-        print("Extracting text from PDF...")
-        try:
-            text = self.base_pdf_service.extract_text_from_pdf(pdf_content)
-        except Exception as e:
-            raise Exception(f"Failed to extract text from PDF: {str(e)}")
-        
+        if document is None:
+            print("Extracting text from PDF...")
+            emit_progress(progress, "stage", stage="extracting")
+            try:
+                document = await self.base_pdf_service.load_document_async(pdf_content)
+            except Exception as e:
+                raise Exception(f"Failed to extract text from PDF: {str(e)}")
+        
+        text = document.text
         if not text.strip():
             raise Exception("No text content found in the PDF")
         
@@ -125,7 +130,7 @@ class EnhancedPDFService:
         
         # Analyze document complexity
         print("Analyzing document complexity...")
-        metadata = self._analyze_document_complexity(text, pdf_content)
+        metadata = self._analyze_document_complexity(document)
         
         print(f"Document analysis: {metadata['document_type']} with {metadata['word_count']} words")
         
@@ -138,7 +143,10 @@ class EnhancedPDFService:
         
         # Process with hierarchical summarizer
         print("Starting hierarchical multi-LLM processing...")
-        hierarchical_result = await self.hierarchical_summarizer.summarize_document(text, enhanced_prompt)
+        hierarchical_result = await self.hierarchical_summarizer.summarize_document(
+            text, enhanced_prompt, word_count=document.word_count, progress=progress, strategy=selection_strategy,
+            embedding_backend=embedding_backend
+        )
         processing_time = time.time() - start_time
         processing_stats = {
             "total_processing_time": processing_time,
@@ -146,7 +154,10 @@ class EnhancedPDFService:
             "models_attempted": list(hierarchical_result.model_results.keys()),
             "best_performing_model": hierarchical_result.best_model,
             "overall_confidence": hierarchical_result.best_similarity,
-            "processing_efficiency": metadata["word_count"] / max(processing_time, 0.001)
+            "processing_efficiency": metadata["word_count"] / max(processing_time, 0.001),
+            "selection": hierarchical_result.processing_metadata.get("selection", {}),
+            "embedding_backend": hierarchical_result.processing_metadata.get("embedding_backend"),
+            "extraction_stats": document.extraction_stats
         }
         return BookProcessingResult(
             hierarchical_summary=hierarchical_result,
@@ -154,8 +165,14 @@ class EnhancedPDFService:
             processing_stats=processing_stats
         )
     
-    async def process_large_book(self, pdf_content: bytes, user_prompt: str, chapter_detection: bool = True) -> BookProcessingResult:
-        result = await self.process_document(pdf_content, user_prompt)
+    async def process_large_book(self, pdf_content: Optional[bytes], user_prompt: str, chapter_detection: bool = True,
+                                 document: Optional[ParsedDocument] = None,
+                                 progress: Optional[ProgressCallback] = None,
+                                 selection_strategy: Optional[str] = None,
+                                 embedding_backend: Optional[str] = None) -> BookProcessingResult:
+        result = await self.process_document(pdf_content, user_prompt, document=document, progress=progress,
+                                             selection_strategy=selection_strategy,
+                                             embedding_backend=embedding_backend)
         if result.document_metadata.get("document_type") == "book":
             result.document_metadata["book_processing_notes"] = [
                 "Document processed as a book using hierarchical summarization",
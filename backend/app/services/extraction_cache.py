@@ -0,0 +1,150 @@
+import gzip
+import json
+import os
+import hashlib
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.config import EXTRACTION_CACHE_DIR, EXTRACTION_CACHE_MAX_MB, EXTRACTION_CACHE_ENABLED
+
+# Bump when the stored document layout changes; older entries are then ignored
+CACHE_FORMAT_VERSION = 2
+
+
+class ExtractionCache:
+    """
+    Content-addressed on-disk cache of parsed PDFs.
+
+    Entries are keyed by the SHA-256 of the PDF bytes and stored as gzip-compressed
+    JSON (page texts + document stats, see ParsedDocument.to_cache_entry). Reads
+    refresh the file's mtime, and the least recently used entries are deleted once
+    the cache grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir: str = EXTRACTION_CACHE_DIR, max_bytes: int = EXTRACTION_CACHE_MAX_MB * 1024 * 1024,
+                 enabled: bool = EXTRACTION_CACHE_ENABLED):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._total_bytes: Optional[int] = None  # Scanned from disk on first write
+
+    @staticmethod
+    def key_for(pdf_content: bytes) -> str:
+        return hashlib.sha256(pdf_content).hexdigest()
+
+    def _path_for(self, key: str) -> Path:
+        # Two-character fan-out keeps directories small
+        return self.cache_dir / key[:2] / f"{key}.json.gz"
+
+    def _entry_paths(self):
+        return self.cache_dir.glob("*/*.json.gz")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+
+        path = self._path_for(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                payload = json.load(f)
+            if payload.get("version") != CACHE_FORMAT_VERSION:
+                raise ValueError(f"stale cache format {payload.get('version')}")
+            document = payload["document"]
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        except Exception as e:
+            print(f"⚠️  Dropping unreadable extraction cache entry {key[:12]}: {str(e)}")
+            self._delete(path)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return document
+
+    def put(self, key: str, document: Dict[str, Any]):
+        if not self.enabled:
+            return
+
+        path = self._path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{key}.{uuid.uuid4().hex}.tmp")
+
+        try:
+            with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+                json.dump({"version": CACHE_FORMAT_VERSION, "document": document}, f, separators=(",", ":"))
+            size = tmp_path.stat().st_size
+            previous_size = path.stat().st_size if path.exists() else 0
+            os.replace(tmp_path, path)  # Atomic: readers never see a partial entry
+        except Exception as e:
+            print(f"⚠️  Could not write extraction cache entry {key[:12]}: {str(e)}")
+            self._delete(tmp_path)
+            return
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(p.stat().st_size for p in self._entry_paths())
+            else:
+                self._total_bytes += size - previous_size
+            if self._total_bytes > self.max_bytes:
+                self._evict_locked()
+
+    def _delete(self, path: Path) -> int:
+        try:
+            size = path.stat().st_size
+            path.unlink()
+            return size
+        except OSError:
+            return 0
+
+    def _evict_locked(self):
+        """Delete least recently used entries until the cache is back under 90% of its budget."""
+        entries = []
+        for path in self._entry_paths():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        self._total_bytes = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, _, path in entries:
+            if self._total_bytes <= target:
+                break
+            self._total_bytes -= self._delete(path)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "directory": str(self.cache_dir),
+                "bytes": self._total_bytes or 0,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+# Global extraction cache instance
+extraction_cache = ExtractionCache()
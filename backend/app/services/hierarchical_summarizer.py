@@ -1,20 +1,57 @@
 import asyncio # concurency
+import functools
 import numpy as np
 import time
-from typing import Dict, List, Any, Tuple, Optional
+from typing import Dict, List, Any, Tuple, Optional, Callable
 from dataclasses import dataclass, asdict # clean way to definbe data holding classes
 from concurrent.futures import ThreadPoolExecutor # parallelism
-from sklearn.metrics.pairwise import cosine_similarity
 import re # For markdown post-processing
 
 from app.services.semantic_chunker import LightningSemanticChunker, SemanticChunk
-from app.services.embedding_service import get_embedding, get_embeddings_batch
+from app.services.embedding_service import get_embeddings_batch, get_embedding_backend
+from app.services.similarity import paired_cosine
 from app.services.llm_service import (
     get_openai_response, get_claude_response, 
     get_gemini_response, get_mistral_response
 )
+from app.services.rate_limiter import rate_limiter, is_rate_limit_error, PRIORITY_BULK, PRIORITY_REDUCE
+from app.config import (
+    RATE_LIMIT_MAX_REQUEUES, SELECTION_STRATEGY, CASCADE_PROBE_CHUNKS, CASCADE_TOP_K, RACE_SIMILARITY_THRESHOLD
+)
 # from app.services.factuality_checker import FactualityChecker, FactualityResult  # DISABLED
 
+# Receives (event_type, data) as the pipelines advance: "stage", "chunk_summary", "merge_level", "model_complete"
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
+
+def emit_progress(progress: Optional[ProgressCallback], event_type: str, **data):
+    """Report a progress event; a failing callback must never break summarization."""
+    if progress is None:
+        return
+    try:
+        progress(event_type, data)
+    except Exception as e:
+        print(f"⚠️  Progress callback failed for {event_type}: {str(e)}")
+
+# How summarize_document decides which model pipelines run to completion
+SELECTION_STRATEGIES = ("all", "cascade", "race")
+
+# ModelSummaryResult.status values
+MODEL_COMPLETE = "complete"
+MODEL_DROPPED = "dropped"  # Not continued past the cascade probe
+MODEL_CANCELLED = "cancelled"  # Stopped because another pipeline won the race
+
+class CountingModelFunc:
+    """Wraps an llm_service model function and counts the calls made through it."""
+    
+    def __init__(self, model_func):
+        functools.update_wrapper(self, model_func)  # Keeps __name__, which _provider_name relies on
+        self.model_func = model_func
+        self.calls = 0
+    
+    async def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return await self.model_func(*args, **kwargs)
+
 @dataclass
 class ModelSummaryResult:
     model_name: str
@@ -26,6 +63,9 @@ class ModelSummaryResult:
     # factuality_results: Optional[List[FactualityResult]] = None  # DISABLED - Factuality checking results for chunk summaries
     # overall_factuality_score: Optional[float] = None  # DISABLED - Average factuality confidence across all chunks
     error: Optional[str] = None
+    llm_calls: int = 0  # Chunk + merge calls made for this model, including cascade probes
+    status: str = MODEL_COMPLETE
+    last_stage_input: Optional[str] = None  # Held only while final-stage scoring is deferred to a cross-model batch
 
 @dataclass
 class HierarchicalSummaryResult:
@@ -60,6 +100,7 @@ class OptimizedHierarchicalSummarizer:
         self.max_chunks_per_merge = 12  # Maximum chunks per merge for speed
         self.max_output_tokens = 3500
         self.compression_ratio = 0.2  # Ultra-aggressive compression
+        self.pipelined_reduce = True  # Start merging chunk groups while other chunks are still being summarized
         
         # Model functions mapping
         self.model_functions = {
@@ -151,7 +192,7 @@ CRITICAL REQUIREMENTS:
 Ultra-concise summary ({target_words} words max):"""
         
         try:
-            model_name, response = await model_func(prompt)
+            model_name, response = await model_func(prompt, priority=PRIORITY_BULK, token_cost=chunk.token_count)
             
             # EMERGENCY TRUNCATION: Ensure chunk summaries don't exceed limits
             words = response.split()
@@ -174,98 +215,96 @@ Ultra-concise summary ({target_words} words max):"""
             self._log_error(f"[{model_name}] chunk {chunk.chunk_index}", e)
             return f"[{model_name}] Error processing chunk {chunk.chunk_index}: {str(e)}", str(e)
     
-    async def _process_chunks_parallel(self, chunks: List[SemanticChunk], user_prompt: str, model_func) -> List[Tuple[str, str]]:
-        """Process chunks in batches to avoid rate limits while staying fast."""
-        # Get model name from function
-        model_name = "UNKNOWN"
-        try:
-            if hasattr(model_func, '__name__'):
-                if 'openai' in model_func.__name__.lower():
-                    model_name = "OPENAI"
-                elif 'mistral' in model_func.__name__.lower():
-                    model_name = "MISTRAL"
-                elif 'claude' in model_func.__name__.lower():
-                    model_name = "CLAUDE"
-                elif 'gemini' in model_func.__name__.lower():
-                    model_name = "GEMINI"
-        except:
-            pass
-            
-        print(f"⚡ [{model_name}] Processing {len(chunks)} chunks in batches...")
-        
-        # Adjust batch size based on model for stability
-        if model_name == "OPENAI":
-            batch_size = 4  # Much smaller batches for OpenAI to avoid rate limits
-        elif model_name == "MISTRAL":
-            batch_size = len(chunks)  # ALL chunks at once for Mistral (2M TPM - no batching needed!)
-        elif model_name == "CLAUDE":
-            batch_size = 4  # Smaller batches for Claude Haiku to avoid rate limits
-        elif model_name == "GEMINI":
-            batch_size = len(chunks)  # ALL chunks at once for Gemini (high TPM - no batching needed!)
-        else:
-            batch_size = 10  # Default fallback
-        all_results = []
+    def _provider_name(self, model_func) -> str:
+        """Upper-case provider name (OPENAI, CLAUDE, ...) derived from a model function's name."""
+        function_name = getattr(model_func, '__name__', '').lower()
+        for provider in ("openai", "mistral", "claude", "gemini"):
+            if provider in function_name:
+                return provider.upper()
+        return "UNKNOWN"
+    
+    def _launch_chunk_tasks(self, chunks: List[SemanticChunk], user_prompt: str, model_func,
+                            progress: Optional[ProgressCallback] = None,
+                            chunk_summaries: Optional[Dict[int, Tuple[str, str]]] = None) -> List[asyncio.Task]:
+        """
+        Start one task per chunk, paced by the provider's rate-limit-aware scheduler. Each yields (summary, error).
+        Chunks found in `chunk_summaries` (by chunk_index, e.g. cascade probes) reuse that result without a call.
+        """
+        model_name = self._provider_name(model_func)
+        scheduler = rate_limiter.get(model_name)
+        chunk_summaries = chunk_summaries or {}
+        print(f"⚡ [{model_name}] Processing {len(chunks)} chunks through the {model_name.lower()} scheduler "
+              f"(window {int(scheduler.window)}, {scheduler.limits.requests_per_minute} RPM, "
+              f"{scheduler.limits.tokens_per_minute:,} TPM)...")
+        if chunk_summaries:
+            print(f"   ♻️  [{model_name}] Reusing {len(chunk_summaries)} chunk summaries")
         
-        for i in range(0, len(chunks), batch_size):
-            batch = chunks[i:i + batch_size]
-            batch_num = i//batch_size + 1
-            total_batches = (len(chunks) + batch_size - 1)//batch_size
-            print(f"   📦 [{model_name}] Processing batch {batch_num}/{total_batches} ({len(batch)} chunks) - chunks {i} to {min(i+batch_size, len(chunks))-1}...")
-            
-            # Process chunks in parallel within each batch
-            try:
-                tasks = [
-                    self._summarize_chunk_aggressive(chunk, user_prompt, model_func)
-                    for chunk in batch
-                ]
-                
-                results = await asyncio.gather(*tasks, return_exceptions=True)
-                print(f"      ✅ [{model_name}] Batch {batch_num} completed successfully")
-            except Exception as e:
-                print(f"      ❌ [{model_name}] Batch {batch_num} failed: {str(e)}")
-                results = [Exception(f"Batch processing error: {str(e)}")] * len(batch)
-            
-            # Handle exceptions for this batch
-            for j, result in enumerate(results):
-                chunk_index = i + j
-                if isinstance(result, Exception):
-                    self._log_error(f"batch processing chunk {chunk_index}", result)
-                    all_results.append((f"Error in chunk {chunk_index}: {str(result)}", str(result)))
-                else:
-                    all_results.append(result)
+        completed = 0
+        
+        async def summarize_and_report(chunk: SemanticChunk) -> Tuple[str, str]:
+            # Each chunk starts as soon as the scheduler admits it; no lock-step batches
+            nonlocal completed
+            # Admission (and 429 backoff) happens per call inside llm_service's shared rate limiter
+            if chunk.chunk_index in chunk_summaries:
+                summary, error = chunk_summaries[chunk.chunk_index]
+            else:
+                for attempt in range(RATE_LIMIT_MAX_REQUEUES + 1):
+                    summary, error = await self._summarize_chunk_aggressive(chunk, user_prompt, model_func)
+                    if not (error and is_rate_limit_error(error)) or attempt == RATE_LIMIT_MAX_REQUEUES:
+                        break
+                    print(f"   🔁 [{model_name}] Re-queueing rate-limited chunk {chunk.chunk_index} "
+                          f"(attempt {attempt + 2})")
             
-            # Small delays for OpenAI stability
-            if i + batch_size < len(chunks):  # Don't delay after last batch
-                if model_name == "OPENAI":
-                    await asyncio.sleep(1)  # 1 second for OpenAI to avoid rate limits
-                # No delay for other models
+            completed += 1
+            emit_progress(progress, "chunk_summary", model=model_name.lower(), chunk_index=chunk.chunk_index,
+                          completed=completed, total=len(chunks), summary=summary, error=error or None)
+            return summary, error
         
-        return all_results
+        return [asyncio.create_task(summarize_and_report(chunk)) for chunk in chunks]
     
-    async def _merge_summaries_recursive_optimized(self, summaries: List[str], user_prompt: str, 
-                                                  model_func, level: int = 0, model_name: str = "UNKNOWN") -> Tuple[str, List[str]]:
+    @staticmethod
+    def _chunk_failed(summary: Optional[str], error: str) -> bool:
         """
-        Optimized recursive merging with strict token control and intermediate tracking.
-        Returns: (final_summary, intermediate_summaries_list)
+        Whether a chunk's (summary, error) result must be left out of merging and scoring.
+        Shared by the pipelined and non-pipelined map paths so both keep the same chunks.
         """
-        intermediate_summaries = []
+        return bool(error) or not (summary or "").strip()
+    
+    def _collect_chunk_results(self, results: List[Any], model_name: str) -> List[Tuple[str, str]]:
+        """Turn gathered chunk task outcomes into (summary, error) pairs, logging exceptions."""
+        all_results = []
+        for chunk_index, result in enumerate(results):
+            if isinstance(result, BaseException):
+                self._log_error(f"scheduled processing chunk {chunk_index}", result)
+                error = str(result) or type(result).__name__  # CancelledError has no message
+                all_results.append((f"Error in chunk {chunk_index}: {error}", error))
+            else:
+                all_results.append(result)
         
-        if len(summaries) <= 1:
-            final_summary = summaries[0] if summaries else "No content to summarize"
-            return final_summary, intermediate_summaries
+        print(f"      ✅ [{model_name.upper()}] {len(results)} chunks processed")
+        return all_results
+    
+    async def _process_chunks_parallel(self, chunks: List[SemanticChunk], user_prompt: str, model_func,
+                                       progress: Optional[ProgressCallback] = None,
+                                       chunk_summaries: Optional[Dict[int, Tuple[str, str]]] = None) -> List[Tuple[str, str]]:
+        """Process all chunks concurrently, paced by the provider's rate-limit-aware scheduler."""
+        tasks = self._launch_chunk_tasks(chunks, user_prompt, model_func, progress, chunk_summaries)
+        try:
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        return self._collect_chunk_results(results, self._provider_name(model_func))
+    
+    def _build_final_merge_prompt(self, summaries: List[str], user_prompt: str) -> Tuple[str, str, int]:
+        """Final-merge prompt over up to max_chunks_per_merge summaries. Returns (combined_text, prompt, target_words)."""
+        combined_text = "\n\n".join([f"Section {i+1}: {summary}" for i, summary in enumerate(summaries)])
         
-        print(f"🔧 [{model_name.upper()}] Merge level {level}: {len(summaries)} summaries")
+        # CALCULATE TARGET: Ensure final output is exactly within 3500 tokens
+        target_words = int(max(2500, min(4000, self.max_output_tokens // 1.1)))  # Convert to integer for slice indexing
         
-        # Base case: Final merge to target output
-        if len(summaries) <= self.max_chunks_per_merge:
-            #1: Calculate Combined Text 
-            combined_text = "\n\n".join([f"Section {i+1}: {summary}" for i, summary in enumerate(summaries)])
-            
-            # CALCULATE TARGET: Ensure final output is exactly within 3500 tokens
-            estimated_tokens = len(combined_text.split()) * 1.3  # Rough token estimation
-            target_words = int(max(2500, min(4000, self.max_output_tokens // 1.1)))  # Convert to integer for slice indexing
-            
-            merge_prompt = f"""
+        merge_prompt = f"""
 Create a COMPREHENSIVE but CONCISE final summary from these sections for: "{user_prompt}"
 
 Section summaries:
@@ -284,36 +323,17 @@ FINAL SUMMARY REQUIREMENTS:
 - Focus on the user's specific request: "{user_prompt}"
 
 Final Summary ({target_words} words max):"""
-            
-            try:
-                _, final_summary = await model_func(merge_prompt)
-                
-                # STRICT TOKEN CONTROL: Ensure 3500 token limit
-                words = final_summary.split()
-                if len(words) > target_words:
-                    print(f"⚠️  Final summary too long ({len(words)} words), truncating to {target_words}")
-                    final_summary = ' '.join(words[:target_words]) + "\n\n[Summary truncated to meet token limit]"
-                
-                intermediate_summaries.append(combined_text)  # Store the pre-final stage
-                return final_summary, intermediate_summaries
-                
-            except Exception as e:
-                self._log_error(f"[{model_name.upper()}] merge level {level}", e)
-                return f"[{model_name.upper()}] Error in final merge: {str(e)}", intermediate_summaries
+        return combined_text, merge_prompt, target_words
+    
+    def _build_intermediate_merge_prompt(self, batch: List[str], user_prompt: str) -> Tuple[str, str, int]:
+        """Intermediate-merge prompt for one group of summaries. Returns (combined_batch, prompt, target_words)."""
+        combined_batch = "\n\n".join([f"Part {j+1}: {summary}" for j, summary in enumerate(batch)])
         
-        else:
-            # Intermediate merge: Process in batches
-            batch_summaries = []
-            
-            for i in range(0, len(summaries), self.max_chunks_per_merge):
-                batch = summaries[i:i + self.max_chunks_per_merge]
-                combined_batch = "\n\n".join([f"Part {j+1}: {summary}" for j, summary in enumerate(batch)])
-                
-                # Intermediate compression target - Conservative to stay within context limits
-                # Each 600-word chunk summary ≈ 800 tokens, so we need to be very conservative
-                target_words = min(600, int(len(combined_batch.split()) * 0.3))  # 30% compression for safety
-                
-                batch_prompt = f"""
+        # Intermediate compression target - Conservative to stay within context limits
+        # Each 600-word chunk summary ≈ 800 tokens, so we need to be very conservative
+        target_words = min(600, int(len(combined_batch.split()) * 0.3))  # 30% compression for safety
+        
+        batch_prompt = f"""
 Create a CONCISE intermediate summary combining these parts for: "{user_prompt}"
 
 Parts to combine:
@@ -327,102 +347,311 @@ INTERMEDIATE SUMMARY REQUIREMENTS:
 - Focus on information relevant to: "{user_prompt}"
 
 Intermediate Summary ({target_words} words max):"""
-                
-                try:
-                    _, batch_summary = await model_func(batch_prompt)
-                    
-                    # Truncate if needed/if summary is too long (le dernie/base case)
-                    words = batch_summary.split()
-                    if len(words) > target_words:
-                        batch_summary = ' '.join(words[:target_words]) + "..."
-                    
-                    batch_summaries.append(batch_summary)
-                    intermediate_summaries.append(combined_batch)  # Store this stage
-                    
-                except Exception as e:
-                    error_msg = f"[{model_name.upper()}] Error in batch {i//self.max_chunks_per_merge}: {str(e)}"
-                    batch_summaries.append(error_msg)
-                    print(f"❌ {error_msg}")
+        return combined_batch, batch_prompt, target_words
+    
+    async def _final_merge(self, summaries: List[str], user_prompt: str, model_func, level: int,
+                           model_name: str, progress: Optional[ProgressCallback] = None) -> Tuple[str, List[str]]:
+        """Merge the last (at most max_chunks_per_merge) summaries into the final output."""
+        combined_text, merge_prompt, target_words = self._build_final_merge_prompt(summaries, user_prompt)
+        try:
+            _, final_summary = await model_func(merge_prompt, priority=PRIORITY_REDUCE)
             
-            # Recursive call for next level
-            final_summary, deeper_intermediates = await self._merge_summaries_recursive_optimized(
-                batch_summaries, user_prompt, model_func, level + 1, model_name
-            )
+            # STRICT TOKEN CONTROL: Ensure 3500 token limit
+            words = final_summary.split()
+            if len(words) > target_words:
+                print(f"⚠️  Final summary too long ({len(words)} words), truncating to {target_words}")
+                final_summary = ' '.join(words[:target_words]) + "\n\n[Summary truncated to meet token limit]"
             
-            intermediate_summaries.extend(deeper_intermediates)
-            return final_summary, intermediate_summaries
+            emit_progress(progress, "merge_level", model=model_name, level=level, inputs=len(summaries),
+                          outputs=1, final=True)
+            return final_summary, [combined_text]  # Store the pre-final stage
+            
+        except Exception as e:
+            self._log_error(f"[{model_name.upper()}] merge level {level}", e)
+            return f"[{model_name.upper()}] Error in final merge: {str(e)}", []
     
-    async def _calculate_final_stage_similarity(self, final_summary: str, last_stage_input: str, model_name: str = "UNKNOWN") -> float:
-        """Calculate cosine similarity between final summary and last-stage input text."""
+    async def _merge_group(self, inputs: List[Any], user_prompt: str, model_func, level: int, group_index: int,
+                           model_name: str, merge_errors: Optional[List[str]] = None
+                           ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Intermediate merge of one group. Inputs are summaries or tasks producing
+        (summary, combined_text) from the level below; the merge is dispatched as
+        soon as this group's own inputs are ready. Returns (summary, combined_text).
+        Inputs that resolve to a None summary (failed chunks or merges) are skipped; a group
+        with nothing left returns (None, None) without calling the model. A failed merge also
+        returns (None, None), so the level above skips it, and its error goes to `merge_errors`.
+        """
+        batch = await self._resolve_merge_inputs(inputs)
+        if not batch:
+            return None, None
+        
+        combined_batch, batch_prompt, target_words = self._build_intermediate_merge_prompt(batch, user_prompt)
         try:
-            if not last_stage_input or not final_summary:
-                return 0.0
-            
-            # Get embeddings for both texts
-            summary_embedding = await get_embedding(final_summary)
-            input_embedding = await get_embedding(last_stage_input)
+            _, batch_summary = await model_func(batch_prompt, priority=PRIORITY_REDUCE)
             
-            # Calculate cosine similarity
-            similarity = cosine_similarity(
-                np.array(summary_embedding).reshape(1, -1),
-                np.array(input_embedding).reshape(1, -1)
-            )[0][0]
+            # Truncate if needed/if summary is too long (le dernie/base case)
+            words = batch_summary.split()
+            if len(words) > target_words:
+                batch_summary = ' '.join(words[:target_words]) + "..."
+            return batch_summary, combined_batch
             
-            return float(similarity)
+        except Exception as e:
+            error_msg = f"[{model_name.upper()}] Error in batch {group_index}: {str(e)}"
+            print(f"❌ {error_msg}")
+            if merge_errors is not None:
+                merge_errors.append(error_msg)
+            return None, None
+    
+    async def _resolve_merge_inputs(self, inputs: List[Any]) -> List[str]:
+        """Await pending merge inputs (in order) and drop the ones without a summary."""
+        pending = [item for item in inputs if not isinstance(item, str)]
+        if not pending:
+            return list(inputs)
+        resolved = iter(await asyncio.gather(*pending))
+        batch = [item if isinstance(item, str) else next(resolved)[0] for item in inputs]
+        return [summary for summary in batch if summary is not None]
+    
+    async def _merge_summaries_recursive_optimized(self, summaries: List[Any], user_prompt: str, 
+                                                  model_func, level: int = 0, model_name: str = "UNKNOWN",
+                                                  progress: Optional[ProgressCallback] = None,
+                                                  merge_errors: Optional[List[str]] = None) -> Tuple[str, List[str]]:
+        """
+        Optimized recursive merging with strict token control and intermediate tracking.
+        Returns: (final_summary, intermediate_summaries_list)
+        
+        The merge tree is planned up front: every group of max_chunks_per_merge
+        summaries becomes a task, and each higher-level group starts as soon as
+        its own children finish, so independent merges of a level run concurrently
+        (paced by the provider limiter) instead of one after another.
+        
+        `summaries` may also hold tasks producing (summary or None, _) - e.g. chunk
+        summaries still in flight - so merging starts before the map phase ends.
+        Errors of failed intermediate merges are appended to `merge_errors`.
+        """
+        if len(summaries) <= self.max_chunks_per_merge:
+            # No intermediate level: wait for every input, then merge once
+            summaries = await self._resolve_merge_inputs(summaries)
+        
+        if len(summaries) <= 1:
+            final_summary = summaries[0] if summaries else "No content to summarize"
+            return final_summary, []
+        
+        print(f"🔧 [{model_name.upper()}] Merge level {level}: {len(summaries)} summaries")
+        
+        # Base case: Final merge to target output
+        if len(summaries) <= self.max_chunks_per_merge:
+            return await self._final_merge(summaries, user_prompt, model_func, level, model_name, progress)
+        
+        # Intermediate levels: one task per group, wired to the tasks of the level below
+        levels: List[List[asyncio.Task]] = []
+        current: List[Any] = list(summaries)
+        final_level = level
+        
+        def report_group_done(level_index: int, level_inputs: int, level_tasks: List[asyncio.Task]):
+            def callback(_):
+                if all(task.done() for task in level_tasks):
+                    emit_progress(progress, "merge_level", model=model_name, level=level_index, inputs=level_inputs,
+                                  outputs=len(level_tasks), final=False)
+            return callback
+        
+        while len(current) > self.max_chunks_per_merge:
+            level_tasks = [
+                asyncio.create_task(self._merge_group(
+                    current[i:i + self.max_chunks_per_merge], user_prompt, model_func,
+                    final_level, i // self.max_chunks_per_merge, model_name, merge_errors
+                ))
+                for i in range(0, len(current), self.max_chunks_per_merge)
+            ]
+            for task in level_tasks:
+                task.add_done_callback(report_group_done(final_level, len(current), level_tasks))
+            print(f"🔧 [{model_name.upper()}] Merge level {final_level}: {len(current)} summaries -> {len(level_tasks)} groups")
+            levels.append(level_tasks)
+            current = level_tasks
+            final_level += 1
+        
+        try:
+            top_results = await asyncio.gather(*current)
+        except BaseException:
+            for level_tasks in levels:
+                for task in level_tasks:
+                    task.cancel()
+            raise
+        
+        # Keep the original stage order: every level's groups in section order
+        intermediate_summaries = [
+            combined for level_tasks in levels for combined in (task.result()[1] for task in level_tasks)
+            if combined is not None
+        ]
+        
+        top_summaries = [summary for summary, _ in top_results if summary is not None]
+        if not top_summaries:
+            if merge_errors:
+                raise Exception(f"All intermediate merges failed: {merge_errors[-1]}")
+            return "No content to summarize", intermediate_summaries
+        
+        print(f"🔧 [{model_name.upper()}] Merge level {final_level}: {len(top_summaries)} summaries")
+        final_summary, final_stage = await self._final_merge(
+            top_summaries, user_prompt, model_func, final_level, model_name, progress
+        )
+        intermediate_summaries.extend(final_stage)
+        return final_summary, intermediate_summaries
+    
+    async def _calculate_final_stage_similarity(self, final_summary: str, last_stage_input: str, model_name: str = "UNKNOWN",
+                                                embedding_backend: Optional[str] = None) -> float:
+        """Calculate cosine similarity between final summary and last-stage input text."""
+        try:
+            # Both texts in one request, coalesced with the scoring of concurrently finishing pipelines
+            similarities = await self._final_stage_similarities([(final_summary, last_stage_input)], embedding_backend)
+            return similarities[0]
         except Exception as e:
             self._log_error(f"[{model_name.upper()}] final-stage similarity calculation", e)
             return 0.0
     
+    async def _final_stage_similarities(self, pairs: List[Tuple[str, str]],
+                                        embedding_backend: Optional[str] = None) -> List[float]:
+        """
+        Cosine similarity of each (final_summary, last_stage_input) pair, for one pipeline or
+        several: every text goes into one embeddings request and all pairs are scored by one
+        stacked paired_cosine. Pairs with an empty side score 0.0.
+        """
+        similarities = [0.0] * len(pairs)
+        scored = [i for i, (final_summary, last_stage_input) in enumerate(pairs) if final_summary and last_stage_input]
+        if not scored:
+            return similarities
+        
+        embeddings = await get_embeddings_batch([text for i in scored for text in pairs[i]], embedding_backend)
+        for i, similarity in zip(scored, paired_cosine(embeddings[0::2], embeddings[1::2])):
+            similarities[i] = float(similarity)
+        return similarities
+    
+    async def _pipelined_map_reduce(self, chunks: List[SemanticChunk], user_prompt: str, model_func, model_name: str,
+                                    progress: Optional[ProgressCallback] = None,
+                                    chunk_summaries: Optional[Dict[int, Tuple[str, str]]] = None,
+                                    merge_errors: Optional[List[str]] = None
+                                    ) -> Tuple[List[Tuple[str, str]], str, List[str]]:
+        """
+        Streaming reduce tree over in-flight chunk summaries.
+        
+        Every run of max_chunks_per_merge consecutive chunks feeds one level-0 merge,
+        which is dispatched as soon as those chunks finish (failed chunks are skipped);
+        higher levels fill in the same way, so only the final merge waits for the
+        whole map phase. Section order is preserved because groups are fixed by
+        chunk position, not completion order.
+        
+        Returns: (chunk_results, final_summary, intermediate_summaries)
+        """
+        chunk_tasks = self._launch_chunk_tasks(chunks, user_prompt, model_func, progress, chunk_summaries)
+        remaining = len(chunk_tasks)
+        
+        async def leaf(task: asyncio.Task) -> Tuple[Optional[str], None]:
+            nonlocal remaining
+            try:
+                summary, error = await task
+            except Exception as e:
+                summary, error = None, str(e)
+            remaining -= 1
+            if remaining == 0:
+                emit_progress(progress, "stage", model=model_name, stage="merging")
+            return (None if self._chunk_failed(summary, error) else summary), None
+        
+        leaves = [asyncio.create_task(leaf(task)) for task in chunk_tasks]
+        try:
+            final_summary, intermediate_summaries = await self._merge_summaries_recursive_optimized(
+                leaves, user_prompt, model_func, model_name=model_name, progress=progress, merge_errors=merge_errors
+            )
+        except BaseException:
+            for task in chunk_tasks + leaves:
+                task.cancel()
+            raise
+        
+        results = await asyncio.gather(*chunk_tasks, return_exceptions=True)
+        return self._collect_chunk_results(results, model_name), final_summary, intermediate_summaries
+    
     async def _process_model_pipeline_optimized(self, model_name: str, chunks: List[SemanticChunk], 
-                                              user_prompt: str) -> ModelSummaryResult:
-        """Process complete model pipeline with optimized similarity calculation."""
+                                              user_prompt: str, progress: Optional[ProgressCallback] = None,
+                                              model_func=None,
+                                              chunk_summaries: Optional[Dict[int, Tuple[str, str]]] = None,
+                                              embedding_backend: Optional[str] = None,
+                                              defer_scoring: bool = False) -> ModelSummaryResult:
+        """
+        Process complete model pipeline with optimized similarity calculation.
+        With `defer_scoring` the final-stage similarity is left to _score_final_stages, which
+        scores several pipelines at once; the result then carries its last_stage_input.
+        """
         print(f"\n🚀 OPTIMIZED PIPELINE: {model_name.upper()}")
         start_time = time.time()
         
         try:
-            model_func = self.model_functions[model_name]
+            model_func = model_func or self.model_functions[model_name]
+            merge_errors: List[str] = []  # Failed intermediate merges, reported alongside chunk errors
             
             # STEP 1: Parallel chunk summarization
             print(f"⚡ [{model_name.upper()}] Step 1: Summarizing {len(chunks)} chunks...")
-            chunk_results = await self._process_chunks_parallel(chunks, user_prompt, model_func)
-            
-            # Extract valid summaries
-            valid_summaries = [result[0] for result in chunk_results if not result[0].startswith("Error")]
-            errors = [result[1] for result in chunk_results if result[1]]
-            
-            if not valid_summaries:
-                raise Exception("No valid chunk summaries generated")
-            
-            print(f"✅ [{model_name.upper()}] Generated {len(valid_summaries)} valid chunk summaries")
+            emit_progress(progress, "stage", model=model_name, stage="summarizing_chunks", chunks_total=len(chunks))
             
-            # STEP 2: Factuality checking DISABLED for faster processing
-            print(f"🚫 [{model_name.upper()}] Step 2: Factuality checking SKIPPED")
-            factuality_results = []
-            overall_factuality_score = 0.0  # Disabled - no factuality checking
-            
-            # STEP 3: Recursive merging with intermediate tracking
-            print(f"⚡ [{model_name.upper()}] Step 3: Recursive merging...")
-            final_summary, intermediate_summaries = await self._merge_summaries_recursive_optimized(
-                valid_summaries, user_prompt, model_func, model_name=model_name
-            )
+            if self.pipelined_reduce:
+                # STEPS 1+3 overlapped: merges start as soon as their group of chunk summaries is ready
+                chunk_results, final_summary, intermediate_summaries = await self._pipelined_map_reduce(
+                    chunks, user_prompt, model_func, model_name, progress, chunk_summaries, merge_errors
+                )
+                valid_summaries = [summary for summary, error in chunk_results if not self._chunk_failed(summary, error)]
+                errors = [error for _, error in chunk_results if error]
+                
+                if not valid_summaries:
+                    raise Exception("No valid chunk summaries generated")
+                
+                print(f"✅ [{model_name.upper()}] Merged {len(valid_summaries)} valid chunk summaries while mapping")
+            else:
+                chunk_results = await self._process_chunks_parallel(chunks, user_prompt, model_func, progress,
+                                                                    chunk_summaries)
+                
+                # Extract valid summaries
+                valid_summaries = [summary for summary, error in chunk_results if not self._chunk_failed(summary, error)]
+                errors = [error for _, error in chunk_results if error]
+                
+                if not valid_summaries:
+                    raise Exception("No valid chunk summaries generated")
+                
+                print(f"✅ [{model_name.upper()}] Generated {len(valid_summaries)} valid chunk summaries")
+                
+                # STEP 2: Factuality checking DISABLED for faster processing
+                print(f"🚫 [{model_name.upper()}] Step 2: Factuality checking SKIPPED")
+                
+                # STEP 3: Recursive merging with intermediate tracking
+                print(f"⚡ [{model_name.upper()}] Step 3: Recursive merging...")
+                emit_progress(progress, "stage", model=model_name, stage="merging", summaries=len(valid_summaries))
+                final_summary, intermediate_summaries = await self._merge_summaries_recursive_optimized(
+                    valid_summaries, user_prompt, model_func, model_name=model_name, progress=progress,
+                    merge_errors=merge_errors
+                )
             
-            # STEP 4: Calculate similarity with LAST STAGE INPUT (not original document)
-            print(f"⚡ [{model_name.upper()}] Step 4: Calculating final-stage similarity...")
+            errors.extend(merge_errors)
             
             # Use the last intermediate summary as the "previous stage"
             last_stage_input = intermediate_summaries[-1] if intermediate_summaries else " ".join(valid_summaries)
             
-            # Skip similarity calculation if OpenAI quota is exceeded
-            try:
-                final_similarity = await self._calculate_final_stage_similarity(final_summary, last_stage_input, model_name)
-            except Exception as e:
-                print(f"⚠️  [{model_name.upper()}] Skipping similarity calculation due to error: {str(e)}")
-                final_similarity = 0.5  # Default similarity score
+            # STEP 4: Calculate similarity with LAST STAGE INPUT (not original document)
+            if defer_scoring:
+                print(f"⏸️  [{model_name.upper()}] Step 4: Final-stage similarity deferred to the cross-model batch")
+                final_similarity = 0.0
+            else:
+                print(f"⚡ [{model_name.upper()}] Step 4: Calculating final-stage similarity...")
+                emit_progress(progress, "stage", model=model_name, stage="scoring")
+                
+                # Skip similarity calculation if OpenAI quota is exceeded
+                try:
+                    final_similarity = await self._calculate_final_stage_similarity(
+                        final_summary, last_stage_input, model_name, embedding_backend
+                    )
+                except Exception as e:
+                    print(f"⚠️  [{model_name.upper()}] Skipping similarity calculation due to error: {str(e)}")
+                    final_similarity = 0.5  # Default similarity score
             
             processing_time = time.time() - start_time
             
             print(f"✅ [{model_name.upper()}] pipeline complete in {processing_time:.2f}s")
-            print(f"   📊 [{model_name.upper()}] Final similarity: {final_similarity:.3f}")
+            if not defer_scoring:
+                print(f"   📊 [{model_name.upper()}] Final similarity: {final_similarity:.3f}")
             # print(f"   🔍 [{model_name.upper()}] Factuality score: {overall_factuality_score:.3f}")  # DISABLED
             print(f"   📝 [{model_name.upper()}] Output length: {len(final_summary.split())} words")
             
@@ -435,7 +664,8 @@ Intermediate Summary ({target_words} words max):"""
                 intermediate_summaries=intermediate_summaries,
                 # factuality_results=factuality_results,  # DISABLED
                 # overall_factuality_score=overall_factuality_score,  # DISABLED
-                error="; ".join(errors) if errors else None
+                error="; ".join(errors) if errors else None,
+                last_stage_input=last_stage_input if defer_scoring else None
             )
             
         except Exception as e:
@@ -454,28 +684,41 @@ Intermediate Summary ({target_words} words max):"""
                 error=str(e)
             )
     
-    async def _process_single_model_complete(self, model_name: str, text: str, user_prompt: str) -> ModelSummaryResult:
-        """Process complete single model pipeline from chunking to final summary."""
+    async def _process_single_model_complete(self, model_name: str, text: str, user_prompt: str,
+                                             chunks: Optional[List[SemanticChunk]] = None,
+                                             progress: Optional[ProgressCallback] = None, model_func=None,
+                                             chunk_summaries: Optional[Dict[int, Tuple[str, str]]] = None,
+                                             embedding_backend: Optional[str] = None,
+                                             defer_scoring: bool = False) -> ModelSummaryResult:
+        """
+        Process complete single model pipeline from chunking to final summary.
+        With `defer_scoring`, model_complete is reported by _score_final_stages instead.
+        """
         print(f"\n🚀 COMPLETE PIPELINE: {model_name.upper()}")
         
         try:
-            # STEP 1: Lightning-fast chunking
-            print(f"⚡ Creating chunks for {model_name}...")
-            chunks = await asyncio.to_thread(
-                self.semantic_chunker.create_semantic_chunks, 
-                text, 
-                model_name
-            )
+            # STEP 1: Lightning-fast chunking (skipped when the shared chunking plan already ran)
+            if chunks is None:
+                print(f"⚡ Creating chunks for {model_name}...")
+                emit_progress(progress, "stage", model=model_name, stage="chunking")
+                chunks = await asyncio.to_thread(
+                    self.semantic_chunker.create_semantic_chunks, 
+                    text, 
+                    model_name
+                )
             
             if not chunks:
                 raise Exception(f"No chunks created for {model_name}")
             
             # STEP 2: Complete pipeline processing
-            return await self._process_model_pipeline_optimized(model_name, chunks, user_prompt)
+            result = await self._process_model_pipeline_optimized(
+                model_name, chunks, user_prompt, progress, model_func, chunk_summaries, embedding_backend,
+                defer_scoring
+            )
             
         except Exception as e:
             self._log_error(f"complete pipeline for {model_name}", e)
-            return ModelSummaryResult(
+            result = ModelSummaryResult(
                 model_name=model_name,
                 summary=f"Complete pipeline error: {str(e)}",
                 chunks_processed=0,
@@ -486,8 +729,331 @@ Intermediate Summary ({target_words} words max):"""
                 # overall_factuality_score=0.0,  # DISABLED
                 error=str(e)
             )
+        
+        if not defer_scoring:
+            self._report_model_complete(result, progress)
+        return result
+    
+    async def _score_final_stages(self, model_results: List[ModelSummaryResult], embedding_backend: Optional[str],
+                                  progress: Optional[ProgressCallback]):
+        """
+        Final-stage similarity of every pipeline that deferred it, in one embeddings request
+        and one stacked paired_cosine, then report each model as complete.
+        """
+        pending = [result for result in model_results if result.last_stage_input is not None]
+        if pending:
+            print(f"⚡ Scoring {len(pending)} final summaries in one batch...")
+            try:
+                similarities = await self._final_stage_similarities(
+                    [(result.summary, result.last_stage_input) for result in pending], embedding_backend
+                )
+            except Exception as e:
+                self._log_error("batched final-stage similarity calculation", e)
+                similarities = [0.0] * len(pending)
+            for result, similarity in zip(pending, similarities):
+                result.final_similarity = similarity
+                result.last_stage_input = None
+                print(f"   📊 [{result.model_name.upper()}] Final similarity: {similarity:.3f}")
+        for result in model_results:
+            self._report_model_complete(result, progress)
+    
+    def _report_model_complete(self, result: ModelSummaryResult, progress: Optional[ProgressCallback]):
+        emit_progress(progress, "model_complete", model=result.model_name, similarity=result.final_similarity,
+                      processing_time=result.processing_time, chunks_processed=result.chunks_processed,
+                      summary=result.summary, error=result.error, status=result.status)
+    
+    def _exception_result(self, model_name: str, error: BaseException) -> ModelSummaryResult:
+        self._log_error(f"pipeline for {model_name}", error)
+        message = str(error) or type(error).__name__
+        return ModelSummaryResult(
+            model_name=model_name,
+            summary=f"Pipeline exception: {message}",
+            chunks_processed=0,
+            final_similarity=0.0,
+            processing_time=0.0,
+            intermediate_summaries=[],
+            # factuality_results=[],  # DISABLED
+            # overall_factuality_score=0.0,  # DISABLED
+            error=message
+        )
+    
+    def _stopped_result(self, model_name: str, status: str, reason: str, chunks_processed: int,
+                        processing_time: float, progress: Optional[ProgressCallback]) -> ModelSummaryResult:
+        """Result for a pipeline the selection strategy stopped early (dropped or cancelled)."""
+        print(f"   ⏹️  [{model_name.upper()}] {reason}")
+        result = ModelSummaryResult(
+            model_name=model_name,
+            summary=reason,
+            chunks_processed=chunks_processed,
+            final_similarity=0.0,
+            processing_time=processing_time,
+            intermediate_summaries=[],
+            status=status
+        )
+        self._report_model_complete(result, progress)
+        return result
+    
+    def _planned_llm_calls(self, chunk_count: int) -> int:
+        """Calls one full pipeline makes for chunk_count chunks: one per chunk plus one per merge group."""
+        calls = chunk_count
+        remaining = chunk_count
+        while remaining > self.max_chunks_per_merge:
+            remaining = -(-remaining // self.max_chunks_per_merge)
+            calls += remaining
+        return calls + (1 if remaining > 1 else 0)
+    
+    def _probe_sample(self, chunks: List[SemanticChunk], count: int) -> List[SemanticChunk]:
+        """`count` evenly spaced chunks, so the probe sees the start, middle and end of the document."""
+        if len(chunks) <= count:
+            return list(chunks)
+        step = (len(chunks) - 1) / max(count - 1, 1)
+        return [chunks[round(i * step)] for i in range(count)]
+    
+    async def _run_all_pipelines(self, text: str, user_prompt: str, selected_models: List[str],
+                                 model_chunks: Dict[str, List[SemanticChunk]], model_funcs: Dict[str, CountingModelFunc],
+                                 progress: Optional[ProgressCallback], embedding_backend: Optional[str] = None
+                                 ) -> Tuple[Dict[str, ModelSummaryResult], Dict[str, Any]]:
+        """
+        Strategy "all": every pipeline runs to completion. Without a progress listener waiting
+        on per-model model_complete events, final-stage scoring waits for the last pipeline
+        and scores all of them in one batch.
+        """
+        defer_scoring = progress is None
+        model_tasks = [
+            (model_name, self._process_single_model_complete(
+                model_name, text, user_prompt, model_chunks.get(model_name), progress, model_funcs[model_name],
+                embedding_backend=embedding_backend, defer_scoring=defer_scoring
+            ))
+            for model_name in selected_models
+        ]
+        print(f"⚡ Launching {len(model_tasks)} model pipelines in parallel (OpenAI + Mistral + Claude + Gemini)...")
+        
+        model_results = {}
+        if model_tasks:
+            results = await asyncio.gather(*(task for _, task in model_tasks), return_exceptions=True)
+            for (model_name, _), result in zip(model_tasks, results):
+                if isinstance(result, BaseException):
+                    model_results[model_name] = self._exception_result(model_name, result)
+                else:
+                    model_results[model_name] = result
+            if defer_scoring:
+                await self._score_final_stages(list(model_results.values()), embedding_backend, progress)
+        return model_results, {}
+    
+    async def _run_cascade(self, text: str, user_prompt: str, selected_models: List[str],
+                           model_chunks: Dict[str, List[SemanticChunk]], model_funcs: Dict[str, CountingModelFunc],
+                           progress: Optional[ProgressCallback], embedding_backend: Optional[str] = None
+                           ) -> Tuple[Dict[str, ModelSummaryResult], Dict[str, Any]]:
+        """
+        Strategy "cascade": summarize CASCADE_PROBE_CHUNKS evenly spaced chunks with every
+        model, score each model by the similarity between those chunks and their summaries
+        (one embeddings batch for all models), and run the full map-reduce only for the
+        CASCADE_TOP_K best. The probe summaries are reused by the continued pipelines.
+        """
+        probe_count = max(1, CASCADE_PROBE_CHUNKS)
+        top_k = max(1, CASCADE_TOP_K)
+        if len(selected_models) <= top_k:
+            print(f"🔎 Cascade: {len(selected_models)} models <= top-k {top_k}, running every pipeline")
+            return await self._run_all_pipelines(text, user_prompt, selected_models, model_chunks, model_funcs, progress,
+                                                 embedding_backend)
+        
+        probe_start = time.time()
+        print(f"🔎 Cascade: probing {probe_count} chunks per model, continuing the top {top_k}")
+        
+        async def probe(model_name: str) -> Tuple[List[SemanticChunk], List[Tuple[str, str]]]:
+            chunks = model_chunks.get(model_name)
+            if chunks is None:
+                chunks = await asyncio.to_thread(self.semantic_chunker.create_semantic_chunks, text, model_name)
+                model_chunks[model_name] = chunks
+            sample = self._probe_sample(chunks, probe_count)
+            emit_progress(progress, "stage", model=model_name, stage="probing", chunks_total=len(sample))
+            return sample, await self._process_chunks_parallel(sample, user_prompt, model_funcs[model_name], progress)
+        
+        probe_results = await asyncio.gather(*(probe(model_name) for model_name in selected_models),
+                                             return_exceptions=True)
+        probes = {}
+        for model_name, result in zip(selected_models, probe_results):
+            if isinstance(result, BaseException):
+                self._log_error(f"[{model_name.upper()}] cascade probe", result)
+                probes[model_name] = ([], [])
+            else:
+                probes[model_name] = result
+        
+        probe_scores = await self._score_probes(probes, embedding_backend)
+        ranked = sorted(selected_models, key=lambda model_name: probe_scores[model_name], reverse=True)
+        continued, dropped = ranked[:top_k], ranked[top_k:]
+        probe_time = time.time() - probe_start
+        
+        print(f"🔎 Cascade probe finished in {probe_time:.2f}s:")
+        for model_name in ranked:
+            marker = "→ continue" if model_name in continued else "✗ drop"
+            print(f"   • {model_name}: probe similarity {probe_scores[model_name]:.3f} {marker}")
+        
+        model_results = {
+            model_name: self._stopped_result(
+                model_name, MODEL_DROPPED,
+                f"Not selected by cascade (probe similarity {probe_scores[model_name]:.3f})",
+                len(probes[model_name][0]), probe_time, progress
+            )
+            for model_name in dropped
+        }
+        
+        # Finalists are scored together once the last one finishes, as in strategy "all"
+        defer_scoring = progress is None
+        model_tasks = []
+        for model_name in continued:
+            sample, results = probes[model_name]
+            reused = {chunk.chunk_index: result for chunk, result in zip(sample, results)
+                      if not self._chunk_failed(*result)}
+            model_tasks.append((model_name, self._process_single_model_complete(
+                model_name, text, user_prompt, model_chunks.get(model_name), progress, model_funcs[model_name], reused,
+                embedding_backend, defer_scoring
+            )))
+        results = await asyncio.gather(*(task for _, task in model_tasks), return_exceptions=True)
+        for (model_name, _), result in zip(model_tasks, results):
+            if isinstance(result, BaseException):
+                model_results[model_name] = self._exception_result(model_name, result)
+            else:
+                model_results[model_name] = result
+        if defer_scoring:
+            await self._score_final_stages([model_results[model_name] for model_name in continued], embedding_backend,
+                                           progress)
+        
+        return {model_name: model_results[model_name] for model_name in selected_models}, {
+            "probe_chunks": probe_count,
+            "top_k": top_k,
+            "probe_scores": probe_scores,
+            "probe_time": probe_time
+        }
+    
+    async def _score_probes(self, probes: Dict[str, Tuple[List[SemanticChunk], List[Tuple[str, str]]]],
+                            embedding_backend: Optional[str] = None) -> Dict[str, float]:
+        """
+        Mean chunk-vs-summary cosine similarity per model over its probe chunks.
+        Every text is embedded in a single batch request.
+        """
+        pairs = []  # (model_name, chunk text, summary)
+        for model_name, (sample, results) in probes.items():
+            for chunk, (summary, error) in zip(sample, results):
+                if not self._chunk_failed(summary, error):
+                    pairs.append((model_name, chunk.content, summary))
+        
+        scores = {model_name: 0.0 for model_name in probes}
+        if not pairs:
+            return scores
+        
+        try:
+            embeddings = await get_embeddings_batch(
+                [text for _, chunk_text, summary in pairs for text in (chunk_text, summary)], embedding_backend
+            )
+            similarities = paired_cosine(embeddings[0::2], embeddings[1::2])
+        except Exception as e:
+            # Without embeddings fall back to ranking by probe success rate
+            self._log_error("cascade probe scoring", e)
+            similarities = np.ones(len(pairs))
+        
+        per_model: Dict[str, List[float]] = {}
+        for (model_name, _, _), similarity in zip(pairs, similarities):
+            per_model.setdefault(model_name, []).append(float(similarity))
+        for model_name, values in per_model.items():
+            # Failed probe chunks count as zero similarity
+            scores[model_name] = sum(values) / len(probes[model_name][0])
+        return scores
     
-    async def summarize_document(self, text: str, user_prompt: str) -> HierarchicalSummaryResult:
+    async def _run_race(self, text: str, user_prompt: str, selected_models: List[str],
+                        model_chunks: Dict[str, List[SemanticChunk]], model_funcs: Dict[str, CountingModelFunc],
+                        progress: Optional[ProgressCallback], embedding_backend: Optional[str] = None
+                        ) -> Tuple[Dict[str, ModelSummaryResult], Dict[str, Any]]:
+        """
+        Strategy "race": run every pipeline concurrently; the first one to finish with a
+        final-stage similarity of at least RACE_SIMILARITY_THRESHOLD wins and the others
+        are cancelled. If none reaches the threshold, all finish and the best one is used.
+        """
+        race_start = time.time()
+        print(f"🏁 Race: first pipeline with similarity >= {RACE_SIMILARITY_THRESHOLD:.2f} wins")
+        tasks = {
+            asyncio.create_task(self._process_single_model_complete(
+                model_name, text, user_prompt, model_chunks.get(model_name), progress, model_funcs[model_name],
+                embedding_backend=embedding_backend
+            )): model_name
+            for model_name in selected_models
+        }
+        
+        model_results: Dict[str, ModelSummaryResult] = {}
+        winner = None
+        time_to_winner = None
+        pending = set(tasks)
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    model_name = tasks[task]
+                    if task.cancelled():
+                        result = self._exception_result(model_name, asyncio.CancelledError("pipeline cancelled"))
+                    elif task.exception():
+                        result = self._exception_result(model_name, task.exception())
+                    else:
+                        result = task.result()
+                    model_results[model_name] = result
+                    if result.final_similarity >= RACE_SIMILARITY_THRESHOLD and (
+                            winner is None or result.final_similarity > model_results[winner].final_similarity):
+                        winner = model_name
+                        time_to_winner = time.time() - race_start
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        
+        for task in pending:
+            model_name = tasks[task]
+            model_results[model_name] = self._stopped_result(
+                model_name, MODEL_CANCELLED,
+                f"Cancelled: {winner} reached similarity {model_results[winner].final_similarity:.3f} first",
+                len(model_chunks.get(model_name) or []), time.time() - race_start, progress
+            )
+        
+        if winner:
+            print(f"🏁 Race won by {winner} after {time_to_winner:.2f}s; cancelled {len(pending)} pipelines")
+        else:
+            print(f"🏁 Race: no pipeline reached {RACE_SIMILARITY_THRESHOLD:.2f}, using the best of all")
+        
+        # Keep the usual model order in the results
+        return {model_name: model_results[model_name] for model_name in selected_models}, {
+            "threshold": RACE_SIMILARITY_THRESHOLD,
+            "winner": winner,
+            "time_to_winner": time_to_winner
+        }
+    
+    def _selection_report(self, strategy: str, model_results: Dict[str, ModelSummaryResult],
+                          model_chunks: Dict[str, List[SemanticChunk]], selection_time: float,
+                          details: Dict[str, Any]) -> Dict[str, Any]:
+        """Cost (LLM calls) and latency of the selection strategy against running every pipeline."""
+        calls_by_model = {model_name: result.llm_calls for model_name, result in model_results.items()}
+        planned_all = sum(
+            self._planned_llm_calls(len(model_chunks[model_name]) if model_chunks.get(model_name) is not None
+                                    else result.chunks_processed)
+            for model_name, result in model_results.items()
+        )
+        llm_calls = sum(calls_by_model.values())
+        return {
+            "strategy": strategy,
+            "models_started": list(model_results.keys()),
+            "models_completed": [m for m, r in model_results.items() if r.status == MODEL_COMPLETE],
+            "models_dropped": [m for m, r in model_results.items() if r.status == MODEL_DROPPED],
+            "models_cancelled": [m for m, r in model_results.items() if r.status == MODEL_CANCELLED],
+            "llm_calls": llm_calls,
+            "llm_calls_by_model": calls_by_model,
+            "llm_calls_all_strategy": planned_all,
+            "llm_calls_saved": max(0, planned_all - llm_calls),
+            "selection_time": selection_time,
+            **details
+        }
+    
+    async def summarize_document(self, text: str, user_prompt: str, word_count: Optional[int] = None,
+                                 progress: Optional[ProgressCallback] = None,
+                                 strategy: Optional[str] = None,
+                                 embedding_backend: Optional[str] = None) -> HierarchicalSummaryResult:
         """
         🚀 MAIN METHOD: Lightning-fast hierarchical summarization with optimized performance.
         
@@ -497,47 +1063,65 @@ Intermediate Summary ({target_words} words max):"""
         - Final-stage similarity calculation only
         - Parallel model processing
         - Aggressive compression for speed
+        
+        `progress`, if given, is called with (event_type, data) as chunks, merge levels and pipelines finish.
+        `strategy` is one of SELECTION_STRATEGIES (default: SELECTION_STRATEGY from config).
+        `embedding_backend` names the backend used for similarity scoring (default: EMBEDDING_BACKEND from config).
         """
+        strategy = (strategy or SELECTION_STRATEGY).lower()
+        if strategy not in SELECTION_STRATEGIES:
+            raise ValueError(f"Unknown selection strategy '{strategy}'. Use one of: {', '.join(SELECTION_STRATEGIES)}")
+        embedding_backend = get_embedding_backend(embedding_backend).name
+        
         print(f"\n🚀 OPTIMIZED HIERARCHICAL SUMMARIZATION")
-        print(f"📄 Document: {len(text):,} chars, {len(text.split()):,} words")
+        if word_count is None:
+            word_count = len(text.split())
+        print(f"📄 Document: {len(text):,} chars, {word_count:,} words")
         print(f"🎯 Target output: max {self.max_output_tokens} tokens")
         print(f"❌ Document-summary similarity: DISABLED (as requested)")
         print(f"✅ Final-stage similarity: ENABLED")
+        print(f"🧭 Selection strategy: {strategy}")
+        print(f"🧮 Embedding backend: {embedding_backend}")
         
         start_time = time.time()
         
-        # Launch all four model pipelines in parallel
-        model_tasks = []
         selected_models = ["openai", "mistral", "claude", "gemini"]  # All four models
+        selected_models = [
+            model_name for model_name in selected_models
+            if model_name in self.semantic_chunker.tokenizers.keys() and model_name in self.model_functions
+        ]
         
-        for model_name in selected_models:
-            if model_name in self.semantic_chunker.tokenizers.keys() and model_name in self.model_functions:
-                task = self._process_single_model_complete(model_name, text, user_prompt)
-                model_tasks.append((model_name, task))
-        
-        print(f"⚡ Launching {len(model_tasks)} model pipelines in parallel (OpenAI + Mistral + Claude + Gemini)...")
+        # Shared chunking plan: split and tokenize the document once for all models
+        emit_progress(progress, "stage", stage="chunking", models=selected_models)
+        try:
+            model_chunks = await asyncio.to_thread(
+                self.semantic_chunker.create_shared_chunks, text, selected_models
+            )
+        except Exception as e:
+            self._log_error("shared chunking plan", e)
+            model_chunks = {}  # Each pipeline falls back to chunking on its own
         
-        # Execute all pipelines in parallel
-        model_results = {}
-        if model_tasks:
-            results = await asyncio.gather(*(task for _, task in model_tasks), return_exceptions=True)
-            
-            for (model_name, _), result in zip(model_tasks, results):
-                if isinstance(result, Exception):
-                    self._log_error(f"pipeline for {model_name}", result)
-                    model_results[model_name] = ModelSummaryResult(
-                        model_name=model_name,
-                        summary=f"Pipeline exception: {str(result)}",
-                        chunks_processed=0,
-                        final_similarity=0.0,
-                        processing_time=0.0,
-                        intermediate_summaries=[],
-                        # factuality_results=[],  # DISABLED
-                        # overall_factuality_score=0.0,  # DISABLED
-                        error=str(result)
-                    )
-                else:
-                    model_results[model_name] = result
+        # Count the LLM calls of each model across probe and pipeline stages
+        model_funcs = {model_name: CountingModelFunc(self.model_functions[model_name]) for model_name in selected_models}
+        run_strategy = {
+            "all": self._run_all_pipelines,
+            "cascade": self._run_cascade,
+            "race": self._run_race
+        }[strategy]
+        selection_start = time.time()
+        try:
+            model_results, selection_details = await run_strategy(
+                text, user_prompt, selected_models, model_chunks, model_funcs, progress, embedding_backend
+            )
+        except asyncio.CancelledError:
+            # Cancellation reaches every pipeline task; log what was spent before it arrived
+            calls = sum(model_func.calls for model_func in model_funcs.values())
+            print(f"🛑 Summarization cancelled after {time.time() - start_time:.2f}s ({calls} LLM calls issued)")
+            raise
+        for model_name, result in model_results.items():
+            result.llm_calls = model_funcs[model_name].calls
+        selection = self._selection_report(strategy, model_results, model_chunks, time.time() - selection_start,
+                                           selection_details)
         
         # Select best model based on final-stage similarity (NOT document similarity)
         best_model = "none"
@@ -547,6 +1131,8 @@ Intermediate Summary ({target_words} words max):"""
         print(f"\n📊 MODEL COMPARISON (Final-Stage Similarity):")
         for model_name, result in model_results.items():
             similarity_status = f"{result.final_similarity:.3f}" if result.final_similarity > 0 else "ERROR"
+            if result.status != MODEL_COMPLETE:
+                similarity_status = result.status.upper()
             # factuality_status = f"{result.overall_factuality_score:.3f}" if result.overall_factuality_score else "N/A"  # DISABLED
             print(f"   • {model_name}: Similarity={similarity_status}")  # Factuality disabled
             
@@ -559,7 +1145,8 @@ Intermediate Summary ({target_words} words max):"""
         print(f"   ⚡ Total time: {time.time() - start_time:.2f}s")
         print(f"   🏆 Best model: {best_model} (similarity: {best_similarity:.3f})")
         print(f"   📝 Output: {len(best_summary.split())} words")
-        print(f"   📊 Compression: {len(best_summary.split()) / len(text.split()) * 100:.1f}%")
+        print(f"   📊 Compression: {len(best_summary.split()) / max(word_count, 1) * 100:.1f}%")
+        print(f"   💸 LLM calls: {selection['llm_calls']} ({strategy}; all pipelines: ~{selection['llm_calls_all_strategy']})")
         
         # Format the final summary for better markdown rendering
         formatted_summary = self._format_markdown_summary(best_summary)
@@ -574,7 +1161,9 @@ Intermediate Summary ({target_words} words max):"""
             model_results=model_results,
             processing_metadata={
                 "total_time": time.time() - start_time,
-                "compression_ratio": len(best_summary.split()) / len(text.split())
+                "compression_ratio": len(best_summary.split()) / max(word_count, 1),
+                "selection": selection,
+                "embedding_backend": embedding_backend
             }
         )
     
@@ -626,6 +1215,8 @@ Intermediate Summary ({target_words} words max):"""
                 "chunks_per_second": model_result.chunks_processed / max(model_result.processing_time, 0.001),
                 "intermediate_stages": len(model_result.intermediate_summaries),
                 "error_rate": 1.0 if model_result.error else 0.0,
+                "status": model_result.status,
+                "llm_calls": model_result.llm_calls,
                 "output_length_words": len(model_result.summary.split()),
                 # "factuality_analysis": factuality_stats  # DISABLED - Factuality checking removed
             }
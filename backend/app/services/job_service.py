@@ -0,0 +1,180 @@
+import time
+import uuid
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.config import JOB_MAX_CONCURRENT, JOB_RESULT_TTL_SECONDS
+from app.services.hierarchical_summarizer import ProgressCallback
+
+# Job lifecycle states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATES = (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)
+
+JobRunner = Callable[[ProgressCallback], Awaitable[Dict[str, Any]]]
+
+
+@dataclass
+class JobProgress:
+    """Per-model, per-stage progress folded from the summarizer's progress events."""
+    stage: str = JOB_QUEUED
+    models: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    def _model(self, model_name: str) -> Dict[str, Any]:
+        return self.models.setdefault(model_name, {
+            "stage": "pending",
+            "chunks_total": 0,
+            "chunks_completed": 0,
+            "chunk_errors": 0,
+            "merge_level": None,
+            "similarity": None,
+            "error": None
+        })
+
+    def update(self, event_type: str, data: Dict[str, Any]):
+        model_name = data.get("model")
+        if model_name is None:
+            if event_type == "stage":
+                self.stage = data.get("stage", self.stage)
+            return
+
+        model = self._model(model_name)
+        if event_type == "stage":
+            self.stage = "summarizing"
+            model["stage"] = data.get("stage", model["stage"])
+            if "chunks_total" in data:
+                model["chunks_total"] = data["chunks_total"]
+        elif event_type == "chunk_summary":
+            model["chunks_completed"] = data.get("completed", model["chunks_completed"] + 1)
+            model["chunks_total"] = data.get("total", model["chunks_total"])
+            if data.get("error"):
+                model["chunk_errors"] += 1
+        elif event_type == "merge_level":
+            model["merge_level"] = data.get("level")
+        elif event_type == "model_complete":
+            if data.get("error") and not data.get("similarity"):
+                model["stage"] = "failed"
+            else:
+                model["stage"] = data.get("status") or "complete"
+            model["similarity"] = data.get("similarity")
+            model["error"] = data.get("error")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"stage": self.stage, "models": self.models}
+
+
+@dataclass
+class Job:
+    job_id: str
+    kind: str
+    metadata: Dict[str, Any]
+    status: str = JOB_QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress: JobProgress = field(default_factory=JobProgress)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    task: Optional[asyncio.Task] = None
+
+    def to_status(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": end - (self.started_at or self.created_at),
+            "progress": self.progress.to_dict(),
+            "metadata": self.metadata,
+            "error": self.error,
+            "result_available": self.result is not None
+        }
+
+
+class JobManager:
+    """
+    In-process background job queue.
+
+    Jobs run as asyncio tasks, but at most max_concurrent of them execute at a
+    time; the rest wait in the queued state. Finished jobs (and their results)
+    are kept for result_ttl_seconds so clients can poll for them.
+    """
+
+    def __init__(self, max_concurrent: int = JOB_MAX_CONCURRENT, result_ttl_seconds: int = JOB_RESULT_TTL_SECONDS):
+        self.max_concurrent = max_concurrent
+        self.result_ttl_seconds = result_ttl_seconds
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._jobs: Dict[str, Job] = {}
+
+    def submit(self, kind: str, runner: JobRunner, metadata: Optional[Dict[str, Any]] = None) -> Job:
+        """Queue a job; runner receives a progress callback and returns the JSON-serializable result."""
+        self.prune_expired()
+        job = Job(job_id=str(uuid.uuid4()), kind=kind, metadata=metadata or {})
+        self._jobs[job.job_id] = job
+        job.task = asyncio.create_task(self._run(job, runner))
+        print(f"📥 Job {job.job_id} ({kind}) queued")
+        return job
+
+    async def _run(self, job: Job, runner: JobRunner):
+        try:
+            async with self._semaphore:
+                job.status = JOB_RUNNING
+                job.started_at = time.time()
+                job.progress.stage = JOB_RUNNING
+                print(f"▶️  Job {job.job_id} started")
+                job.result = await runner(job.progress.update)
+                job.status = JOB_COMPLETED
+                job.progress.stage = JOB_COMPLETED
+        except asyncio.CancelledError:
+            job.status = JOB_CANCELLED
+            job.progress.stage = JOB_CANCELLED
+            print(f"🛑 Job {job.job_id} cancelled")
+            raise
+        except Exception as e:
+            job.status = JOB_FAILED
+            job.progress.stage = JOB_FAILED
+            job.error = str(e)
+            print(f"❌ Job {job.job_id} failed: {str(e)}")
+        finally:
+            job.finished_at = time.time()
+            if job.status == JOB_COMPLETED:
+                print(f"✅ Job {job.job_id} completed in {job.finished_at - job.started_at:.2f}s")
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job. Returns None for unknown jobs."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        if job.status not in FINISHED_STATES and job.task is not None:
+            job.task.cancel()
+            # Reflect the cancellation right away; a task cancelled before it starts never reaches _run
+            job.status = JOB_CANCELLED
+            job.progress.stage = JOB_CANCELLED
+            job.finished_at = time.time()
+        return job
+
+    def prune_expired(self) -> int:
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.status in FINISHED_STATES and job.finished_at and now - job.finished_at > self.result_ttl_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {"max_concurrent": self.max_concurrent, "jobs": counts}
@@ -0,0 +1,137 @@
+import sys
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import is_dataclass
+from typing import Any, Dict, Hashable, Optional
+
+# Rough per-entry bookkeeping cost of an OrderedDict slot + timestamp tuple
+ENTRY_OVERHEAD_BYTES = 120
+
+
+def estimate_size(value: Any, _seen: Optional[set] = None) -> int:
+    """Approximate deep memory footprint of a cached value in bytes."""
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    size = sys.getsizeof(value)
+
+    if isinstance(value, (str, bytes, bytearray, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, dict):
+        return size + sum(estimate_size(k, _seen) + estimate_size(v, _seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(estimate_size(item, _seen) for item in value)
+    if is_dataclass(value) or hasattr(value, "__dict__"):
+        return size + estimate_size(vars(value), _seen)
+    return size
+
+
+class BoundedLRUCache:
+    """
+    Thread-safe LRU cache bounded by estimated memory size, entry count and TTL.
+
+    Values are sized with estimate_size() on insertion. Least recently used
+    entries are evicted once max_bytes or max_entries is exceeded, and
+    entries older than ttl_seconds are dropped on access.
+    """
+
+    def __init__(self, name: str, max_bytes: int, max_entries: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, size, inserted_at)
+        self._lock = threading.Lock()
+        self._current_bytes = 0
+
+        # Counters exposed through stats()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejections = 0  # Values larger than the whole cache budget
+
+    def _is_expired(self, inserted_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - inserted_at > self.ttl_seconds
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self._current_bytes -= size
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, _, inserted_at = entry
+            if self._is_expired(inserted_at, time.time()):
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> bool:
+        """Insert a value, evicting LRU entries as needed. Returns False if the value is too large to cache."""
+        size = estimate_size(value) + estimate_size(key) + ENTRY_OVERHEAD_BYTES
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            if size > self.max_bytes:
+                self.rejections += 1
+                return False
+
+            self._entries[key] = (value, size, time.time())
+            self._current_bytes += size
+
+            while self._entries and (
+                self._current_bytes > self.max_bytes
+                or (self.max_entries is not None and len(self._entries) > self.max_entries)
+            ):
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+            return True
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._is_expired(entry[2], time.time())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "rejections": self.rejections,
+            }
@@ -1,9 +1,19 @@
 import io
-from typing import List, Dict, Any
+import os
+import time
+import tempfile
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from itertools import accumulate, repeat
+from typing import List, Dict, Any, Callable, Optional, Tuple
 from pathlib import Path
 import PyPDF2
 import tiktoken
-from dataclasses import dataclass
+from dataclasses import dataclass, field, asdict
 import re
 
 # Try to import pdfplumber as alternative
@@ -16,7 +26,7 @@ except ImportError:
 # Try to import OCR libraries
 try:
     import pytesseract
-    from pdf2image import convert_from_bytes
+    from pdf2image import convert_from_path, pdfinfo_from_bytes
     OCR_AVAILABLE = True
     
     # Configure Tesseract path for Windows
@@ -41,6 +51,141 @@ try:
 except ImportError:
     OCR_AVAILABLE = False
 
+from app.services.extraction_cache import extraction_cache
+from app.config import (
+    PDF_EXTRACTION_WORKERS, PDF_PARALLEL_MIN_PAGES,
+    OCR_WORKERS, OCR_WINDOW_PAGES, OCR_DPI, OCR_MIN_DPI, OCR_MAX_PAGE_PIXELS
+)
+
+# Bytes 0x80-0xBF continue a multi-byte UTF-8 character
+UTF8_CONTINUATION_BYTES = bytes(range(0x80, 0xC0))
+
+# Page extractors run inside worker processes, so they are module-level (picklable) functions.
+# Each one parses the PDF once and returns the texts of the requested pages in order.
+
+def _extract_pages_pypdf2(pdf_content: bytes, page_indices: List[int]) -> List[str]:
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
+    return [pdf_reader.pages[i].extract_text() or "" for i in page_indices]
+
+def _extract_pages_pdfplumber(pdf_content: bytes, page_indices: List[int]) -> List[str]:
+    with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
+        return [pdf.pages[i].extract_text() or "" for i in page_indices]
+
+# Inline image operator ("BI ... ID ... EI") in a page content stream
+INLINE_IMAGE_PATTERN = re.compile(rb"(?:^|\s)BI\s")
+
+def _resources_have_images(resources: Any, depth: int = 0) -> bool:
+    """True if the resources hold an image XObject, directly or inside (nested) form XObjects."""
+    if not resources:
+        return False
+    xobjects = resources.get_object().get("/XObject")
+    if not xobjects:
+        return False
+    for reference in xobjects.get_object().values():
+        xobject = reference.get_object()
+        subtype = xobject.get("/Subtype")
+        if subtype == "/Image":
+            return True
+        if subtype == "/Form" and depth < 8 and _resources_have_images(xobject.get("/Resources"), depth + 1):
+            return True
+    return False
+
+def _pages_with_images(pdf_content: bytes, page_indices: List[int]) -> List[int]:
+    """
+    The pages that draw any image, i.e. the ones OCR can find text in. If the PDF
+    cannot be inspected every page is returned, so OCR is never skipped by mistake.
+    """
+    try:
+        pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
+        pages = []
+        for i in page_indices:
+            page = pdf_reader.pages[i]
+            contents = page.get_contents()
+            if (_resources_have_images(page.get("/Resources"))
+                    or (contents is not None and INLINE_IMAGE_PATTERN.search(contents.get_data()))):
+                pages.append(i)
+        return pages
+    except Exception as e:
+        print(f"OCR: could not inspect page images ({str(e)}), OCR-ing every remaining page")
+        return list(page_indices)
+
+def _ocr_single_page(pdf_path: str, page_index: int, dpi: int) -> str:
+    """Render one page (grayscale, at the given DPI) and OCR it. Only this page's image is held in memory."""
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=page_index + 1,
+                               last_page=page_index + 1, grayscale=True)
+    try:
+        return pytesseract.image_to_string(images[0], lang='eng') if images else ""
+    finally:
+        for image in images:
+            image.close()
+
+_extraction_pool: Optional[ProcessPoolExecutor] = None
+_extraction_pool_lock = threading.Lock()
+
+def _get_extraction_pool() -> ProcessPoolExecutor:
+    """Process pool shared by all PDFService instances, created on first use."""
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is None:
+            # spawn: forking a process that already runs the event loop and thread pools is unsafe
+            _extraction_pool = ProcessPoolExecutor(
+                max_workers=PDF_EXTRACTION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _extraction_pool
+
+def shutdown_extraction_pool():
+    """Stop the extraction worker processes (called on application shutdown)."""
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is not None:
+            _extraction_pool.shutdown(wait=False, cancel_futures=True)
+            _extraction_pool = None
+
+EXTRACTION_ERROR_MESSAGE = """
+Could not extract readable text from PDF. Possible issues:
+1. PDF contains scanned images (need OCR: pip install pytesseract pdf2image)
+2. PDF is encrypted or password protected
+3. PDF has complex formatting or font issues
+4. PDF contains CID encoding problems
+
+Try:
+- Converting PDF to a different format
+- Using a different PDF file
+- Installing OCR dependencies: pip install pytesseract pdf2image
+""".strip()
+
+@dataclass
+class ParsedDocument:
+    """A PDF parsed once: page texts plus the stats extraction, analysis and telemetry share."""
+    page_texts: List[str]
+    page_methods: List[str]  # Extractor that produced each page ("PyPDF2", "PDFPlumber", "OCR", "none")
+    text: str
+    page_count: int
+    word_count: int
+    character_count: int
+    line_count: int
+    total_line_length: int
+    extraction_stats: Dict[str, Any] = field(default_factory=dict)
+    
+    @property
+    def average_line_length(self) -> float:
+        return self.total_line_length / max(self.line_count, 1)
+    
+    @staticmethod
+    def join_pages(page_texts: List[str]) -> str:
+        return "\n".join(page_texts).strip()
+    
+    def to_cache_entry(self) -> Dict[str, Any]:
+        """Serializable form for the extraction cache; `text` is left out and rebuilt from the pages on load."""
+        entry = asdict(self)
+        del entry["text"]
+        return entry
+    
+    @classmethod
+    def from_cache_entry(cls, entry: Dict[str, Any]) -> "ParsedDocument":
+        return cls(text=cls.join_pages(entry["page_texts"]), **entry)
+
 @dataclass
 class DocumentChunk:
     content: str
@@ -59,6 +204,110 @@ class PDFService:
             "mistral": 8000      # Mistral Large has 128k
         }
         self.tokenizer = tiktoken.get_encoding("cl100k_base")  # GPT-4 tokenizer
+        self._token_char_lengths: Dict[int, int] = {}  # token id -> decoded char count
+    
+    def _get_page_count(self, pdf_content: bytes) -> int:
+        """Number of pages, read from the PDF page tree without extracting any text."""
+        try:
+            return len(PyPDF2.PdfReader(io.BytesIO(pdf_content)).pages)
+        except Exception as e:
+            print(f"PyPDF2 could not read the page tree: {str(e)}")
+        
+        if PDFPLUMBER_AVAILABLE:
+            try:
+                with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
+                    return len(pdf.pages)
+            except Exception as e:
+                print(f"pdfplumber could not read the page tree: {str(e)}")
+        
+        if OCR_AVAILABLE:
+            return int(pdfinfo_from_bytes(pdf_content)["Pages"])
+        raise Exception("Could not determine the number of pages in the PDF")
+    
+    def _extract_pages(self, extractor: Callable[[bytes, List[int]], List[str]],
+                       pdf_content: bytes, page_indices: List[int]) -> List[str]:
+        """
+        Run a page extractor over page_indices, split into contiguous ranges across the
+        process pool. Page texts come back in page order.
+        """
+        workers = min(PDF_EXTRACTION_WORKERS, len(page_indices))
+        if workers <= 1 or len(page_indices) < PDF_PARALLEL_MIN_PAGES:
+            return extractor(pdf_content, page_indices)
+        
+        range_size = -(-len(page_indices) // workers)  # ceil division
+        page_ranges = [page_indices[i:i + range_size] for i in range(0, len(page_indices), range_size)]
+        
+        try:
+            range_results = list(_get_extraction_pool().map(extractor, repeat(pdf_content), page_ranges))
+        except BrokenProcessPool as e:
+            print(f"Extraction pool failed ({e}), extracting in-process")
+            shutdown_extraction_pool()
+            return extractor(pdf_content, page_indices)
+        
+        return [page_text for page_texts in range_results for page_text in page_texts]
+    
+    def _get_ocr_dpis(self, pdf_content: bytes, page_indices: List[int]) -> Dict[int, int]:
+        """
+        Per-page render DPI: OCR_DPI unless the page is so large that its raster would
+        exceed OCR_MAX_PAGE_PIXELS, in which case DPI drops (not below OCR_MIN_DPI).
+        """
+        page_sizes = {}
+        try:
+            pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
+            for i in page_indices:
+                box = pdf_reader.pages[i].mediabox
+                page_sizes[i] = (float(box.width) / 72, float(box.height) / 72)  # inches
+        except Exception as e:
+            print(f"OCR: could not read page sizes ({str(e)}), using {OCR_DPI} DPI")
+        
+        dpis = {}
+        for i in page_indices:
+            width_in, height_in = page_sizes.get(i, (0.0, 0.0))
+            if width_in <= 0 or height_in <= 0:
+                dpis[i] = OCR_DPI
+                continue
+            pixel_budget_dpi = int((OCR_MAX_PAGE_PIXELS / (width_in * height_in)) ** 0.5)
+            dpis[i] = max(OCR_MIN_DPI, min(OCR_DPI, pixel_budget_dpi))
+        return dpis
+    
+    def ocr_pages(self, pdf_content: bytes, page_indices: List[int]) -> Tuple[List[str], Dict[str, Any]]:
+        """
+        Streaming OCR: pages are rendered and recognized in bounded windows on a pool of
+        OCR_WORKERS threads (poppler and tesseract run as subprocesses, so threads run them
+        in parallel). At most OCR_WORKERS page images exist at any time. The PDF is written
+        to one temporary file that every page render reads, instead of a copy per page.
+        
+        Returns the page texts in order and throughput stats.
+        """
+        if not OCR_AVAILABLE:
+            raise Exception("OCR libraries not available. Install: pip install pytesseract pdf2image")
+        
+        start_time = time.time()
+        dpis = self._get_ocr_dpis(pdf_content, page_indices)
+        page_texts: List[str] = []
+        
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as pdf_file:
+            pdf_file.write(pdf_content)
+        try:
+            with ThreadPoolExecutor(max_workers=OCR_WORKERS, thread_name_prefix="ocr") as pool:
+                for window_start in range(0, len(page_indices), OCR_WINDOW_PAGES):
+                    window = page_indices[window_start:window_start + OCR_WINDOW_PAGES]
+                    page_texts.extend(pool.map(lambda i: _ocr_single_page(pdf_file.name, i, dpis[i]), window))
+                    
+                    elapsed = time.time() - start_time
+                    print(f"OCR: {len(page_texts)}/{len(page_indices)} pages ({len(page_texts) / max(elapsed, 0.001):.2f} pages/sec)")
+        finally:
+            os.unlink(pdf_file.name)
+        
+        elapsed = time.time() - start_time
+        stats = {
+            "pages": len(page_indices),
+            "seconds": elapsed,
+            "pages_per_second": len(page_indices) / max(elapsed, 0.001),
+            "workers": OCR_WORKERS,
+            "min_dpi_used": min(dpis.values()) if dpis else OCR_DPI,
+        }
+        return page_texts, stats
     
     def extract_text_with_ocr(self, pdf_content: bytes) -> str:
         """Extract text using OCR for image-based or problematic PDFs."""
@@ -66,24 +315,14 @@ class PDFService:
             raise Exception("OCR libraries not available. Install: pip install pytesseract pdf2image")
             
         try:
-            print("Attempting OCR extraction...")
+            # Poppler reads the page count, so OCR still works on PDFs PyPDF2 cannot parse
+            page_count = int(pdfinfo_from_bytes(pdf_content)["Pages"])
+            print(f"Attempting OCR extraction of {page_count} pages...")
             
-            # Convert PDF pages to images
-            images = convert_from_bytes(pdf_content, dpi=300)
-            print(f"OCR: Converted PDF to {len(images)} images")
+            page_texts, stats = self.ocr_pages(pdf_content, list(range(page_count)))
+            text = "\n".join(page_texts)
             
-            text = ""
-            for page_num, image in enumerate(images):
-                print(f"OCR: Processing page {page_num + 1}...")
-                
-                # Extract text from image using OCR
-                page_text = pytesseract.image_to_string(image, lang='eng')
-                print(f"OCR Page {page_num + 1}: {len(page_text)} characters")
-                print(f"OCR First 200 chars: {page_text[:200]}")
-                
-                text += page_text + "\n"
-            
-            print(f"OCR total text: {len(text)} characters")
+            print(f"OCR total text: {len(text)} characters ({stats['pages_per_second']:.2f} pages/sec)")
             return text.strip()
             
         except Exception as e:
@@ -95,87 +334,152 @@ class PDFService:
             raise Exception("pdfplumber not available")
             
         try:
-            text = ""
             with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
-                print(f"PDFPlumber: PDF has {len(pdf.pages)} pages")
-                
-                for page_num, page in enumerate(pdf.pages):
-                    page_text = page.extract_text() or ""
-                    print(f"PDFPlumber Page {page_num + 1}: {len(page_text)} characters")
-                    print(f"PDFPlumber First 200 chars: {page_text[:200]}")
-                    text += page_text + "\n"
+                page_count = len(pdf.pages)
+            print(f"PDFPlumber: PDF has {page_count} pages")
+            
+            page_texts = self._extract_pages(_extract_pages_pdfplumber, pdf_content, list(range(page_count)))
+            text = "\n".join(page_texts)
                     
             print(f"PDFPlumber total text: {len(text)} characters")
             return text.strip()
         except Exception as e:
             raise Exception(f"Error with pdfplumber: {str(e)}")
     
-    def extract_text_from_pdf(self, pdf_content: bytes) -> str:   # Main function with fallback mechnaism for problematic PDF's/Texts
-        """Extract text content from PDF bytes with multiple fallback methods."""
+    def _get_page_extractors(self, extraction_stats: Dict[str, Any]) -> List[Tuple[str, Callable[[bytes, List[int]], List[str]]]]:
+        """Page extractors in fallback order: PyPDF2, then pdfplumber, then OCR."""
+        def ocr_extractor(pdf_content: bytes, pages: List[int]) -> List[str]:
+            page_texts, extraction_stats["ocr"] = self.ocr_pages(pdf_content, pages)
+            return page_texts
         
-        # Method 1: Try PyPDF2 first
-        try:
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
-            text = ""
-            
-            print(f"PyPDF2: PDF has {len(pdf_reader.pages)} pages")
-            
-            for page_num, page in enumerate(pdf_reader.pages):
-                page_text = page.extract_text()
-                print(f"PyPDF2 Page {page_num + 1}: {len(page_text)} characters")
-                print(f"PyPDF2 First 200 chars: {page_text[:200]}")
-                text += page_text + "\n"
+        extractors = [("PyPDF2", partial(self._extract_pages, _extract_pages_pypdf2))]
+        if PDFPLUMBER_AVAILABLE:
+            extractors.append(("PDFPlumber", partial(self._extract_pages, _extract_pages_pdfplumber)))
+        if OCR_AVAILABLE:
+            extractors.append(("OCR", ocr_extractor))
+        return extractors
+    
+    def _extract_pages_routed(self, pdf_content: bytes) -> Tuple[List[str], List[str], Dict[str, Any]]:
+        """
+        Extract page texts with per-page quality routing.
+        
+        Every page goes through PyPDF2 first. Only the pages that fail the CID /
+        letter-ratio heuristics fall through to pdfplumber, and only the ones that
+        still fail go to OCR. Pages without any image are not OCR-ed: blank separator
+        pages and pages holding only a page number have nothing to recognize, and a
+        full-page raster each would cost more than the rest of their extraction.
+        (Text drawn as vector outlines without images is therefore not OCR-ed either.)
+        Results are merged back in page order.
+        
+        Returns (page_texts, page_methods, extraction_stats).
+        """
+        page_count = self._get_page_count(pdf_content)
+        page_texts = [""] * page_count
+        page_methods = ["none"] * page_count
+        extraction_stats: Dict[str, Any] = {"pages_by_method": {}}
+        pending = list(range(page_count))
+        skipped_ocr: List[int] = []
+        
+        for method_name, extractor in self._get_page_extractors(extraction_stats):
+            if method_name == "OCR" and pending:
+                ocr_pages = _pages_with_images(pdf_content, pending)
+                skipped_ocr = sorted(set(pending) - set(ocr_pages))
+                if skipped_ocr:
+                    print(f"OCR: skipping {len(skipped_ocr)} pages without images")
+                pending = ocr_pages
+            if not pending:
+                break
+            try:
+                extracted = extractor(pdf_content, pending)
+            except Exception as e:
+                print(f"{method_name} failed on {len(pending)} pages: {str(e)}")
+                continue
             
-            print(f"PyPDF2 total text: {len(text)} characters")
+            still_pending = []
+            for page_index, page_text in zip(pending, extracted):
+                if page_text.strip():
+                    # Best candidate so far, even if it fails the checks
+                    page_texts[page_index] = page_text
+                    page_methods[page_index] = method_name
+                if self._is_problematic_text(page_text, verbose=False):
+                    still_pending.append(page_index)
             
-            # Check if extraction seems valid
-            if len(text.strip()) > 50 and not self._is_problematic_text(text):
-                print("PyPDF2 extraction successful!")
-                return text.strip()
-            else:
-                print("PyPDF2 extraction has issues, trying alternatives...")
-                
+            print(f"{method_name}: {len(pending) - len(still_pending)}/{len(pending)} pages accepted")
+            pending = still_pending
+        
+        pending += skipped_ocr
+        if pending:
+            print(f"{len(pending)} pages kept their best-effort text after all extractors")
+        
+        for method_name in page_methods:
+            extraction_stats["pages_by_method"][method_name] = extraction_stats["pages_by_method"].get(method_name, 0) + 1
+        extraction_stats["pages_failing_checks"] = len(pending)
+        extraction_stats["ocr_skipped_pages"] = len(skipped_ocr)
+        
+        return page_texts, page_methods, extraction_stats
+    
+    def parse_document(self, pdf_content: bytes) -> ParsedDocument:
+        """Parse a PDF once: routed page extraction plus the text stats every consumer needs."""
+        start_time = time.time()
+        try:
+            page_texts, page_methods, extraction_stats = self._extract_pages_routed(pdf_content)
         except Exception as e:
-            print(f"PyPDF2 failed: {str(e)}")
+            print(f"PDF extraction failed: {str(e)}")
+            raise Exception(EXTRACTION_ERROR_MESSAGE)
         
-        # Method 2: Try pdfplumber if available
-        if PDFPLUMBER_AVAILABLE:
-            try:
-                text = self.extract_text_with_pdfplumber(pdf_content)
-                if len(text.strip()) > 50 and not self._is_problematic_text(text):
-                    print("PDFPlumber extraction successful!")
-                    return text
-                else:
-                    print("PDFPlumber also has issues, trying OCR...")
-            except Exception as e:
-                print(f"pdfplumber failed: {str(e)}")
+        text = ParsedDocument.join_pages(page_texts)
+        print(f"Total extracted text: {len(text)} characters")
+        if len(text) <= 50:
+            raise Exception(EXTRACTION_ERROR_MESSAGE)
         
-        # Method 3: Try OCR as last resort
-        if OCR_AVAILABLE:
+        # Line stats without splitting the full text: every newline ends one line
+        newline_count = text.count("\n")
+        extraction_stats["extraction_time"] = time.time() - start_time
+        
+        return ParsedDocument(
+            page_texts=page_texts,
+            page_methods=page_methods,
+            text=text,
+            page_count=len(page_texts),
+            word_count=sum(len(page_text.split()) for page_text in page_texts),
+            character_count=len(text),
+            line_count=newline_count + 1,
+            total_line_length=len(text) - newline_count,
+            extraction_stats=extraction_stats
+        )
+    
+    async def parse_document_async(self, pdf_content: bytes) -> ParsedDocument:
+        """Run parse_document off the event loop."""
+        return await asyncio.to_thread(self.parse_document, pdf_content)
+    
+    def load_document(self, pdf_content: bytes, cache_key: Optional[str] = None) -> ParsedDocument:
+        """
+        parse_document behind the content-addressed extraction cache (keyed by SHA-256 of the bytes).
+        Pass `cache_key` when the digest is already known, e.g. from a staged upload.
+        """
+        cache_key = cache_key or extraction_cache.key_for(pdf_content)
+        cached = extraction_cache.get(cache_key)
+        if cached is not None:
             try:
-                text = self.extract_text_with_ocr(pdf_content)
-                if len(text.strip()) > 50:
-                    print("OCR extraction successful!")
-                    return text
-            except Exception as e:
-                print(f"OCR failed: {str(e)}")
+                document = ParsedDocument.from_cache_entry(cached)
+                print(f"📋 Using cached extraction for {cache_key[:12]} ({document.page_count} pages)")
+                return document
+            except (TypeError, KeyError) as e:
+                print(f"⚠️  Ignoring incompatible extraction cache entry: {str(e)}")
         
-        # If all methods fail, return error with suggestions
-        error_msg = """
-Could not extract readable text from PDF. Possible issues:
-1. PDF contains scanned images (need OCR: pip install pytesseract pdf2image)
-2. PDF is encrypted or password protected
-3. PDF has complex formatting or font issues
-4. PDF contains CID encoding problems
-
-Try:
-- Converting PDF to a different format
-- Using a different PDF file
-- Installing OCR dependencies: pip install pytesseract pdf2image
-"""
-        raise Exception(error_msg.strip())
+        document = self.parse_document(pdf_content)
+        extraction_cache.put(cache_key, document.to_cache_entry())
+        return document
     
-    def _is_problematic_text(self, text: str) -> bool:
+    async def load_document_async(self, pdf_content: bytes, cache_key: Optional[str] = None) -> ParsedDocument:
+        """Run load_document off the event loop."""
+        return await asyncio.to_thread(self.load_document, pdf_content, cache_key)
+    
+    def extract_text_from_pdf(self, pdf_content: bytes) -> str:   # Main function with fallback mechnaism for problematic PDF's/Texts
+        """Extract text content from PDF bytes with per-page fallback methods."""
+        return self.load_document(pdf_content).text
+    
+    def _is_problematic_text(self, text: str, verbose: bool = True) -> bool:
         """Check if text has common extraction problems."""
         
         # Check for CID encoding issues
@@ -196,18 +500,21 @@ Try:
         if cid_matches > 0:
             cid_ratio = (cid_matches * 10) / total_chars  # Each CID is ~10 chars
             if cid_ratio > 0.3:
-                print(f"Detected CID encoding issues: {cid_matches} CID codes")
+                if verbose:
+                    print(f"Detected CID encoding issues: {cid_matches} CID codes")
                 return True
         
         # If more than 70% is slashes and digits, likely encoded
         encoded_ratio = (slash_count + digit_count) / total_chars
         if encoded_ratio > 0.7:
-            print(f"Detected encoded text: {encoded_ratio:.2%} numbers/slashes")
+            if verbose:
+                print(f"Detected encoded text: {encoded_ratio:.2%} numbers/slashes")
             return True
         
         # If very few letters compared to other characters, problematic
         if letter_count / total_chars < 0.3:
-            print(f"Too few letters: {letter_count/total_chars:.2%} letters")
+            if verbose:
+                print(f"Too few letters: {letter_count/total_chars:.2%} letters")
             return True
             
         return False
@@ -216,6 +523,23 @@ Try:
         """Count tokens in text using GPT-4 tokenizer."""
         return len(self.tokenizer.encode(text))
     
+    def _token_char_offsets(self, tokens: List[int]) -> List[int]:
+        """
+        Prefix character offsets in a single pass: offsets[i] == len(decode(tokens[:i])).
+        
+        The tokens encode valid UTF-8, so decoding a prefix yields one character per
+        non-continuation byte (a character cut off at the end decodes to a single U+FFFD).
+        """
+        # Per-token char counts are memoized by token id, so each vocabulary entry is decoded once
+        char_lengths = self._token_char_lengths
+        for token in set(tokens).difference(char_lengths):
+            token_bytes = self.tokenizer.decode_single_token_bytes(token)
+            char_lengths[token] = len(token_bytes.translate(None, UTF8_CONTINUATION_BYTES))
+        
+        offsets = [0]
+        offsets.extend(accumulate(map(char_lengths.__getitem__, tokens)))
+        return offsets
+    
     def chunk_text(self, text: str, max_tokens: int = 6000, overlap_tokens: int = 200) -> List[DocumentChunk]:
         """
         Chunk text into overlapping segments based on token count.
@@ -238,6 +562,9 @@ Try:
                 token_count=len(tokens)
             )]
         
+        # Prefix char offsets computed once, so chunking stays linear in document length
+        char_offsets = self._token_char_offsets(tokens)
+        
         start_idx = 0
         chunk_index = 0
         
@@ -250,8 +577,8 @@ Try:
             chunk_text = self.tokenizer.decode(chunk_tokens)
             
             # Find character positions (approximate)
-            start_char = len(self.tokenizer.decode(tokens[:start_idx])) if start_idx > 0 else 0
-            end_char = len(self.tokenizer.decode(tokens[:end_idx]))
+            start_char = char_offsets[start_idx]
+            end_char = char_offsets[end_idx]
             
             chunks.append(DocumentChunk(
                 content=chunk_text,
@@ -278,9 +605,11 @@ Try:
         available_tokens = base_limit - prompt_length - 2000  # 2000 for response + margin
         return max(1000, available_tokens)  # Minimum 1000 tokens per chunk
     
-    def prepare_document_for_summarization(self, pdf_content: bytes, prompt: str) -> Dict[str, Any]:
+    def prepare_document_for_summarization(self, pdf_content: Optional[bytes], prompt: str,
+                                           document: Optional[ParsedDocument] = None) -> Dict[str, Any]:
         """
         Prepare a PDF document for summarization by extracting text and chunking appropriately.
+        If an already parsed `document` is given, extraction is skipped.
         
         Returns:
             - full_text: Complete extracted text
@@ -288,7 +617,7 @@ Try:
             - metadata: Document metadata (token count, chunk info, etc.)
         """
         # Extract text from PDF
-        full_text = self.extract_text_from_pdf(pdf_content)
+        full_text = document.text if document is not None else self.extract_text_from_pdf(pdf_content)
         total_tokens = self.count_tokens(full_text)
         prompt_tokens = self.count_tokens(prompt)
         
@@ -0,0 +1,239 @@
+import time
+import heapq
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.config import PROVIDER_RATE_LIMITS, RATE_LIMIT_COOLDOWN_MIN, RATE_LIMIT_COOLDOWN_MAX
+
+
+# Priority classes: lower values are admitted first
+PRIORITY_INTERACTIVE = 0  # /chat, /query - a user is waiting on this one call
+PRIORITY_REDUCE = 1  # Merge calls of document pipelines; ahead of queued chunks so the reduce tree keeps up with the map
+PRIORITY_BULK = 2  # Chunk summaries of document pipelines
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_REDUCE: "reduce", PRIORITY_BULK: "bulk"}
+
+
+def estimate_prompt_tokens(prompt: str) -> int:
+    """Cheap token estimate (~4 characters per token) used to charge the tokens/min bucket."""
+    return max(1, len(prompt) // 4)
+
+
+def is_rate_limit_error(error: Any) -> bool:
+    """True if an exception (or error string) looks like a provider 429 / quota response."""
+    message = str(error).lower()
+    return ("429" in message or "rate limit" in message or "rate_limit" in message
+            or "too many requests" in message or "resource_exhausted" in message
+            or "resource has been exhausted" in message)
+
+
+class TokenBucket:
+    """Continuously refilling token bucket (capacity per minute)."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.refill_per_second = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def time_until(self, amount: float, now: float) -> float:
+        """Seconds until `amount` tokens are available (amounts above capacity wait for a full bucket)."""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing / self.refill_per_second)
+
+    def consume(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+
+
+@dataclass
+class ProviderLimits:
+    requests_per_minute: int
+    tokens_per_minute: int
+    max_in_flight: int
+
+
+class ProviderScheduler:
+    """
+    Admission control for one LLM provider.
+
+    A request is admitted once the requests/min and tokens/min buckets can cover
+    it and fewer than `window` requests are in flight. The window adapts AIMD
+    style: it grows by one request per window's worth of successes and halves on
+    a 429, which also pauses admissions for an exponentially growing cooldown.
+
+    Waiters are served strictly in (priority, arrival) order, so an interactive
+    request queued behind hundreds of bulk chunk summaries is admitted next.
+    """
+
+    def __init__(self, name: str, limits: ProviderLimits):
+        self.name = name
+        self.limits = limits
+        self.requests = TokenBucket(limits.requests_per_minute)
+        self.tokens = TokenBucket(limits.tokens_per_minute)
+        self.window = float(limits.max_in_flight)
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.consecutive_rate_limits = 0
+        self._condition: Optional[asyncio.Condition] = None
+        self._wake_task: Optional[asyncio.Task] = None
+        self._waiters: List[Tuple[int, int]] = []  # Heap of (priority, arrival sequence)
+        self._sequence = itertools.count()
+
+        # Counters exposed through stats()
+        self.admitted = 0
+        self.rate_limited = 0
+        self.cancelled_queued = 0  # Callers cancelled before admission
+        self.cancelled_in_flight = 0  # Callers cancelled while their request was running
+        self.total_wait_seconds = 0.0
+        self.admitted_by_priority: Dict[str, int] = {}
+
+    @property
+    def condition(self) -> asyncio.Condition:
+        # Created lazily so the scheduler binds to the running event loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def _admission_delay(self, token_cost: int, now: float) -> Optional[float]:
+        """Seconds until the request may start, or None if it must wait for a running request to finish."""
+        if self.in_flight >= max(1, int(self.window)):
+            return None
+        return max(self.cooldown_until - now,
+                   self.requests.time_until(1, now),
+                   self.tokens.time_until(token_cost, now))
+
+    async def acquire(self, token_cost: int = 0, priority: int = PRIORITY_INTERACTIVE):
+        start = time.monotonic()
+        ticket = (priority, next(self._sequence))
+        async with self.condition:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    # Only the highest-priority, longest-waiting request may take the next slot
+                    if self._waiters[0] == ticket:
+                        delay = self._admission_delay(token_cost, now)
+                        if delay is not None and delay <= 0:
+                            heapq.heappop(self._waiters)
+                            self.requests.consume(1, now)
+                            self.tokens.consume(token_cost, now)
+                            self.in_flight += 1
+                            self.admitted += 1
+                            name = PRIORITY_NAMES.get(priority, str(priority))
+                            self.admitted_by_priority[name] = self.admitted_by_priority.get(name, 0) + 1
+                            self.total_wait_seconds += now - start
+                            self.condition.notify_all()  # Let the next waiter check its turn
+                            return
+                    else:
+                        delay = None
+                    try:
+                        await asyncio.wait_for(self.condition.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                # Cancelled while queued: drop the ticket so it does not block the queue
+                if ticket in self._waiters:
+                    self._waiters.remove(ticket)
+                    heapq.heapify(self._waiters)
+                    self.condition.notify_all()
+                raise
+
+    def release(self, rate_limited: bool = False):
+        """
+        Return a request slot. Synchronous on purpose: it runs in cleanup of callers that
+        may be cancelled again mid-release, and an interrupted await here would leak the slot.
+        """
+        self.in_flight -= 1
+        if rate_limited:
+            self.rate_limited += 1
+            self.consecutive_rate_limits += 1
+            self.window = max(1.0, self.window / 2)
+            cooldown = min(RATE_LIMIT_COOLDOWN_MAX,
+                           RATE_LIMIT_COOLDOWN_MIN * 2 ** (self.consecutive_rate_limits - 1))
+            self.cooldown_until = max(self.cooldown_until, time.monotonic() + cooldown)
+            print(f"🚦 [{self.name.upper()}] Rate limited: window -> {int(self.window)}, "
+                  f"pausing {cooldown:.1f}s")
+        else:
+            self.consecutive_rate_limits = 0
+            self.window = min(float(self.limits.max_in_flight), self.window + 1.0 / self.window)
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        # notify_all needs the condition's lock, which cannot be taken without awaiting.
+        # One pending wake-up is enough: it reads the state as of when it runs.
+        if self._wake_task is None or self._wake_task.done():
+            self._wake_task = asyncio.get_running_loop().create_task(self._notify_waiters())
+
+    async def _notify_waiters(self):
+        async with self.condition:
+            self.condition.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "window": int(self.window),
+            "max_in_flight": self.limits.max_in_flight,
+            "requests_per_minute": self.limits.requests_per_minute,
+            "tokens_per_minute": self.limits.tokens_per_minute,
+            "admitted": self.admitted,
+            "admitted_by_priority": dict(self.admitted_by_priority),
+            "rate_limited": self.rate_limited,
+            "cancelled_queued": self.cancelled_queued,
+            "cancelled_in_flight": self.cancelled_in_flight,
+            "average_wait_seconds": self.total_wait_seconds / self.admitted if self.admitted else 0.0,
+            "cooling_down": self.cooldown_until > time.monotonic()
+        }
+
+
+class RateLimiter:
+    """Process-wide registry of per-provider schedulers, shared by every LLM call in llm_service."""
+
+    def __init__(self, limits: Dict[str, Dict[str, int]] = PROVIDER_RATE_LIMITS):
+        self.schedulers = {
+            provider: ProviderScheduler(provider, ProviderLimits(**provider_limits))
+            for provider, provider_limits in limits.items()
+        }
+
+    def get(self, provider: str) -> ProviderScheduler:
+        provider = provider.lower()
+        if provider not in self.schedulers:
+            # Unknown providers get a conservative default rather than no limit at all
+            self.schedulers[provider] = ProviderScheduler(provider, ProviderLimits(60, 100000, 4))
+        return self.schedulers[provider]
+
+    @asynccontextmanager
+    async def limit(self, provider: str, token_cost: int, priority: int = PRIORITY_INTERACTIVE) -> AsyncIterator[None]:
+        """Hold one of the provider's request slots; a 429 raised inside shrinks its window."""
+        scheduler = self.get(provider)
+        try:
+            await scheduler.acquire(token_cost, priority)
+        except asyncio.CancelledError:
+            scheduler.cancelled_queued += 1
+            raise
+        rate_limited = False
+        try:
+            yield
+        except asyncio.CancelledError:
+            scheduler.cancelled_in_flight += 1
+            raise
+        except Exception as e:
+            rate_limited = is_rate_limit_error(e)
+            raise
+        finally:
+            scheduler.release(rate_limited=rate_limited)
+
+    def stats(self) -> Dict[str, Any]:
+        return {provider: scheduler.stats() for provider, scheduler in self.schedulers.items()}
+
+
+# Global rate limiter instance
+rate_limiter = RateLimiter()
@@ -1,12 +1,22 @@
 import asyncio
+import os
 import re
+import threading
 import time
 import hashlib
+from array import array
 from typing import List, Dict, Any, Optional, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 import tiktoken
 
+from app.config import (
+    CHUNKER_SENTENCE_CACHE_MB, CHUNKER_TOKEN_CACHE_MB,
+    CHUNKER_CHUNK_CACHE_MB, CHUNKER_CACHE_TTL_SECONDS, TOKENIZER_THREADS
+)
+from app.services.lru_cache import BoundedLRUCache
+
 # Import tokenizers for different models
 try:
     from transformers import AutoTokenizer
@@ -26,6 +36,42 @@ try:
 except ImportError:
     SENTENCEPIECE_AVAILABLE = False
 
+# Sentences per tokenizer pool task - large enough to amortize dispatch, small enough to balance threads
+TOKEN_COUNT_SLICE_SIZE = 2048
+
+_token_count_pool: Optional[ThreadPoolExecutor] = None
+_token_count_pool_lock = threading.Lock()
+
+def _get_token_count_pool(workers: int) -> ThreadPoolExecutor:
+    """Tokenizer pool shared by all chunkers, created on first use."""
+    global _token_count_pool
+    with _token_count_pool_lock:
+        if _token_count_pool is None:
+            _token_count_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tokenizer")
+        return _token_count_pool
+
+def _count_tokens_parallel(encoding, texts: List[str]) -> List[int]:
+    """
+    Count tokens across a shared thread pool in slices of sentences.
+
+    tiktoken releases the GIL while encoding, so slices run truly in parallel.
+    Its own encode_batch submits one pool task per text (and builds a new pool per
+    call), which costs more than encoding a short sentence, hence the slicing here.
+    """
+    def count_slice(batch: List[str]) -> List[int]:
+        return [len(encoding.encode_ordinary(text)) for text in batch]
+    
+    workers = min(TOKENIZER_THREADS, os.cpu_count() or 1)
+    if workers <= 1 or len(texts) <= TOKEN_COUNT_SLICE_SIZE:
+        return count_slice(texts)
+    
+    pool = _get_token_count_pool(workers)
+    slices = [texts[i:i + TOKEN_COUNT_SLICE_SIZE] for i in range(0, len(texts), TOKEN_COUNT_SLICE_SIZE)]
+    counts: List[int] = []
+    for slice_counts in pool.map(count_slice, slices):
+        counts.extend(slice_counts)
+    return counts
+
 @dataclass
 class SemanticChunk:
     content: str
@@ -50,6 +96,24 @@ class ModelTokenizer(ABC):
     @abstractmethod
     def get_model_name(self) -> str:
         pass
+    
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        """Count tokens for many texts at once, identical to calling count_tokens on each."""
+        encoding = getattr(self, "tokenizer", None)
+        if not hasattr(encoding, "encode_ordinary"):
+            return [self.count_tokens(text) for text in texts]
+        
+        # encode() only differs from encode_ordinary() when special tokens appear - check them once
+        joined = "\x00".join(texts)
+        if any(special in joined for special in encoding.special_tokens_set):
+            return [self.count_tokens(text) for text in texts]
+        
+        return _count_tokens_parallel(encoding, texts)
+    
+    def get_encoding_name(self) -> str:
+        """Identity of the underlying encoding - tokenizers sharing it produce identical counts."""
+        encoding = getattr(self, "tokenizer", None)
+        return getattr(encoding, "name", None) or self.get_model_name()
 
 class OpenAITokenizer(ModelTokenizer):
     def __init__(self):
@@ -131,10 +195,17 @@ class LightningSemanticChunker:
             "mistral": MistralTokenizer()
         }
         
-        # Multi-level caching for maximum performance
-        self._sentence_cache = {}  # Cache sentence splits by text hash
-        self._token_cache = {}     # Cache token counts by (text_hash, model) key
-        self._chunk_cache = {}     # Cache complete chunk results
+        # Multi-level caching for maximum performance, bounded so a long-lived process doesn't grow forever
+        mb = 1024 * 1024
+        self._sentence_cache = BoundedLRUCache(  # Cache sentence splits by text hash
+            "sentences", CHUNKER_SENTENCE_CACHE_MB * mb, ttl_seconds=CHUNKER_CACHE_TTL_SECONDS
+        )
+        self._token_cache = BoundedLRUCache(     # Cache token counts by (text_hash, encoding) key
+            "tokens", CHUNKER_TOKEN_CACHE_MB * mb, ttl_seconds=CHUNKER_CACHE_TTL_SECONDS
+        )
+        self._chunk_cache = BoundedLRUCache(     # Cache complete chunk results
+            "chunks", CHUNKER_CHUNK_CACHE_MB * mb, ttl_seconds=CHUNKER_CACHE_TTL_SECONDS
+        )
         
         # Initialize optimized spaCy pipeline
         self.nlp = None
@@ -154,14 +225,22 @@ class LightningSemanticChunker:
         """Generate fast hash for caching."""
         return hashlib.md5(text.encode('utf-8')).hexdigest()[:16]
     
+    def get_cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hit/miss/eviction counters and memory usage for each cache level."""
+        return {
+            cache.name: cache.stats()
+            for cache in (self._sentence_cache, self._token_cache, self._chunk_cache)
+        }
+    
     def _lightning_sentence_split(self, text: str) -> List[str]:
         """⚡ Ultra-fast sentence splitting with intelligent strategy selection."""
         text_hash = self._get_text_hash(text)
         
         # Check cache first
-        if text_hash in self._sentence_cache:
-            print(f"📋 Using cached sentences ({len(self._sentence_cache[text_hash])} sentences)")
-            return self._sentence_cache[text_hash]
+        cached_sentences = self._sentence_cache.get(text_hash)
+        if cached_sentences is not None:
+            print(f"📋 Using cached sentences ({len(cached_sentences)} sentences)")
+            return cached_sentences
         
         print(f"🔧 Lightning sentence splitting: {len(text):,} chars...")
         start_time = time.time()
@@ -189,57 +268,39 @@ class LightningSemanticChunker:
             sentences = [s.strip() for s in sentences if s.strip()]
         
         # Cache the result
-        self._sentence_cache[text_hash] = sentences
+        self._sentence_cache.put(text_hash, sentences)
         
         split_time = time.time() - start_time
         print(f"✅ Split complete: {len(sentences):,} sentences in {split_time:.2f}s ({len(sentences)/split_time:.0f} sent/sec)")
         
         return sentences
     
-    def _lightning_token_counting(self, sentences: List[str], tokenizer: ModelTokenizer, model_type: str) -> List[int]:   #### fo each model 
-        """⚡ Lightning-fast token counting with advanced caching and clean architecture."""
+    def _lightning_token_counting(self, sentences: List[str], tokenizer: ModelTokenizer, model_type: str,
+                                  text_hash: Optional[str] = None) -> List[int]:   #### once per encoding
+        """⚡ Batched token counting: the whole sentence list goes through the tokenizer's batch path."""
         print(f"⚡ Lightning token counting: {len(sentences):,} sentences for {model_type}")
         start_time = time.time()
         
-        sentence_tokens = []
-        cache_hits = 0
-        new_calculations = 0
-        progress_interval = 500
-        
-        for i, sentence in enumerate(sentences):
-            # Smart caching with model-specific keys
-            sentence_hash = self._get_text_hash(sentence)
-            cache_key = f"{sentence_hash}:{model_type}" 
-            # The way this is calculated is not optimal for the current setup 
-            # since for simplicity purposes, I am using the same tokenizer for all models
-            # As long as it works, it is okay.
-            #Plus, I will keep this for later use when working with model-specific tokenizers
-            
-            if cache_key in self._token_cache:
-                token_count = self._token_cache[cache_key]
-                cache_hits += 1
-            else:
-                token_count = tokenizer.count_tokens(sentence)
-                self._token_cache[cache_key] = token_count
-                # crucial operation to populate the token_cache 
-                new_calculations += 1
-            
-            sentence_tokens.append(token_count)
-            
-            # Progress tracking for large documents
-            if i > 0 and i % (progress_interval * 10) == 0:  # Every 5000 sentences
-                elapsed = time.time() - start_time
-                rate = (i + 1) / elapsed if elapsed > 0 else 0
-                print(f"  📊 Progress: {i + 1:,}/{len(sentences):,} sentences ({rate:.0f}/sec)")
+        # One cache entry per (document, encoding) instead of one per sentence
+        if text_hash is None:
+            text_hash = self._get_text_hash("\x1e".join(sentences))
+        cache_key = f"{text_hash}:{tokenizer.get_encoding_name()}"
         
-        count_time = time.time() - start_time
-        efficiency = cache_hits / (cache_hits + new_calculations) * 100 if (cache_hits + new_calculations) > 0 else 0
+        cached_counts = self._token_cache.get(cache_key)
+        if cached_counts is not None and len(cached_counts) == len(sentences):
+            print(f"📋 Using cached token counts ({len(cached_counts):,} sentences)")
+            return list(cached_counts)
+        
+        sentence_tokens = array('I', tokenizer.count_tokens_batch(sentences))
         
+        self._token_cache.put(cache_key, sentence_tokens)
+        
+        count_time = time.time() - start_time
         print(f"✅ Token counting complete in {count_time:.2f}s")
-        print(f"   📈 Cache efficiency: {efficiency:.1f}% ({cache_hits:,} hits, {new_calculations:,} new)")
-        print(f"   🚀 Performance: {len(sentences)/count_time:.0f} sentences/sec")
+        if count_time > 0:
+            print(f"   🚀 Performance: {len(sentences)/count_time:.0f} sentences/sec")
         
-        return sentence_tokens
+        return list(sentence_tokens)
     
     def _lightning_chunk_assembly(self, sentences: List[str], sentence_tokens: List[int], 
                                   model_type: str, overlap_ratio: float, max_tokens: int = 1000) -> List[SemanticChunk]:
@@ -310,53 +371,105 @@ class LightningSemanticChunker:
         
         return chunks
     
+    def _get_max_chunk_tokens(self, tokenizer: ModelTokenizer) -> int:
+        """Chunk budget: 85% of the model's context window."""
+        return int(tokenizer.get_max_context_tokens() * 0.85)
+
     def create_semantic_chunks(self, text: str, model_type: str, overlap_ratio: float = 0.1) -> List[SemanticChunk]:
         """🚀 Create lightning-fast semantic chunks for a specific model."""
-        if model_type not in self.tokenizers:
-            available = list(self.tokenizers.keys())
-            raise ValueError(f"❌ Unsupported model: {model_type}. Available: {available}")
-        
-        print(f"\n🚀 LIGHTNING CHUNKING: {model_type.upper()}")
-        print(f"📄 Document: {len(text):,} chars, {len(text.split()):,} words")
-        
-        # Check cache for complete result
-        cache_key = f"{self._get_text_hash(text)}:{model_type}:{overlap_ratio}"
-        if cache_key in self._chunk_cache:
-            cached_chunks = self._chunk_cache[cache_key]
-            print(f"📋 Using cached chunks: {len(cached_chunks)} chunks")
-            return cached_chunks
-        
-        tokenizer = self.tokenizers[model_type]
-        max_tokens = int(tokenizer.get_max_context_tokens() * 0.85) 
-        
+        return self.create_shared_chunks(text, [model_type], overlap_ratio)[model_type]
+
+    def create_shared_chunks(self, text: str, model_types: Optional[List[str]] = None,
+                             overlap_ratio: float = 0.1) -> Dict[str, List[SemanticChunk]]:
+        """
+        🚀 Chunk a document once for several models (shared chunking plan).
+
+        Sentences are split once per document, token counts are computed once per
+        distinct encoding, and chunks are assembled once per distinct
+        (encoding, chunk budget) layout. Models that share a layout receive the
+        same chunk content, re-tagged with their own model_type.
+        """
+        model_types = list(model_types) if model_types else list(self.tokenizers.keys())
+        for model_type in model_types:
+            if model_type not in self.tokenizers:
+                available = list(self.tokenizers.keys())
+                raise ValueError(f"❌ Unsupported model: {model_type}. Available: {available}")
+
+        print(f"\n🚀 LIGHTNING CHUNKING: {', '.join(m.upper() for m in model_types)}")
+        print(f"📄 Document: {len(text):,} chars")
+
+        text_hash = self._get_text_hash(text)
+        model_chunks: Dict[str, List[SemanticChunk]] = {}
+
+        # Check cache for complete results
+        for model_type in model_types:
+            cached_chunks = self._chunk_cache.get(f"{text_hash}:{model_type}:{overlap_ratio}")
+            if cached_chunks is not None:
+                model_chunks[model_type] = cached_chunks
+                print(f"📋 [{model_type.upper()}] Using cached chunks: {len(model_chunks[model_type])} chunks")
+
+        pending = [m for m in model_types if m not in model_chunks]
+        if not pending:
+            return model_chunks
+
+        # Group pending models by layout: only a different encoding or budget costs extra work
+        layouts: Dict[Tuple[str, int], List[str]] = {}
+        for model_type in pending:
+            tokenizer = self.tokenizers[model_type]
+            layout_key = (tokenizer.get_encoding_name(), self._get_max_chunk_tokens(tokenizer))
+            layouts.setdefault(layout_key, []).append(model_type)
+
+        print(f"🧩 Chunking plan: {len(pending)} models -> {len(layouts)} distinct layouts")
         total_start = time.time()
-        
-        # STEP 1: Lightning sentence splitting
+
+        # STEP 1: Lightning sentence splitting (once per document)
         sentences = self._lightning_sentence_split(text)
-        
-        if not sentences:
-            print("No sentences found, using character fallback")
-            return self._character_fallback(text, tokenizer, max_tokens, model_type)
-        
-        # STEP 2: Lightning token counting with caching
-        sentence_tokens = self._lightning_token_counting(sentences, tokenizer, model_type)
-        
-        # STEP 3: Lightning chunk assembly
-        chunks = self._lightning_chunk_assembly(sentences, sentence_tokens, model_type, overlap_ratio, max_tokens)
-        
-        # Cache the complete result
-        self._chunk_cache[cache_key] = chunks # This is where it gets cached
-        
+
+        # STEP 2: Lightning token counting (once per encoding)
+        encoding_tokens: Dict[str, List[int]] = {}
+
+        for (encoding_name, max_tokens), layout_models in layouts.items():
+            lead_model = layout_models[0]
+            tokenizer = self.tokenizers[lead_model]
+
+            if not sentences:
+                print("No sentences found, using character fallback")
+                chunks = self._character_fallback(text, tokenizer, max_tokens, lead_model)
+            else:
+                if encoding_name not in encoding_tokens:
+                    encoding_tokens[encoding_name] = self._lightning_token_counting(
+                        sentences, tokenizer, lead_model, text_hash
+                    )
+
+                # STEP 3: Lightning chunk assembly (once per layout)
+                chunks = self._lightning_chunk_assembly(
+                    sentences, encoding_tokens[encoding_name], lead_model, overlap_ratio, max_tokens
+                )
+
+            for model_type in layout_models:
+                if model_type == lead_model:
+                    model_chunks[model_type] = chunks
+                else:
+                    # Share content strings, only the model tag differs
+                    model_chunks[model_type] = [replace(chunk, model_type=model_type) for chunk in chunks]
+
+                if sentences:
+                    # Cache the complete result
+                    self._chunk_cache.put(f"{text_hash}:{model_type}:{overlap_ratio}", model_chunks[model_type])
+
         total_time = time.time() - total_start
-        total_tokens = sum(c.token_count for c in chunks)
-        
+
         print(f"\n🎯 LIGHTNING CHUNKING COMPLETE:")
         print(f"   ⚡ Total time: {total_time:.2f}s")
-        print(f"   📊 {len(chunks)} chunks, {total_tokens:,} tokens")
-        print(f"   🚀 Overall performance: {len(sentences)/total_time:.0f} sentences/sec")
-        print(f"   💾 Max chunk size: {max_tokens:,} tokens (85% of {tokenizer.get_max_context_tokens():,})")
-        
-        return chunks
+        for model_type in pending:
+            chunks = model_chunks[model_type]
+            print(f"   📊 {model_type}: {len(chunks)} chunks, {sum(c.token_count for c in chunks):,} tokens")
+        if sentences and total_time > 0:
+            print(f"   🚀 Overall performance: {len(sentences)/total_time:.0f} sentences/sec")
+        for (encoding_name, max_tokens), layout_models in layouts.items():
+            print(f"   💾 {encoding_name}: max chunk size {max_tokens:,} tokens shared by {', '.join(layout_models)}")
+
+        return model_chunks
     
     def _character_fallback(self, text: str, tokenizer: ModelTokenizer, max_tokens: int, model_type: str) -> List[SemanticChunk]:
         """⚡ Fast character-based fallback for edge cases."""
@@ -405,32 +518,14 @@ class LightningSemanticChunker:
         
         start_time = time.time()
         
-        async def process_model(model_type):
-            """Process single model in thread pool."""
-            try:
-                # Run in thread pool to prevent blocking
-                chunks = await asyncio.to_thread(self.create_semantic_chunks, text, model_type)
-                return model_type, chunks
-            except Exception as e:
-                print(f"❌ Error in {model_type}: {e}")
-                return model_type, []
-        
-        # Launch all models in parallel
-        tasks = [process_model(model_type) for model_type in self.tokenizers.keys()]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Collect results
-        model_chunks = {}
-        total_chunks = 0
-        
-        for result in results:
-            if isinstance(result, Exception):
-                print(f"❌ Parallel processing error: {result}")
-                continue
-            
-            model_type, chunks = result
-            model_chunks[model_type] = chunks
-            total_chunks += len(chunks)
+        # One shared chunking plan for all models, in thread pool to prevent blocking
+        try:
+            model_chunks = await asyncio.to_thread(self.create_shared_chunks, text)
+        except Exception as e:
+            print(f"❌ Shared chunking error: {e}")
+            model_chunks = {model_type: [] for model_type in self.tokenizers.keys()}
+
+        total_chunks = sum(len(chunks) for chunks in model_chunks.values())
         
         total_time = time.time() - start_time
         
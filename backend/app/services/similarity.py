@@ -0,0 +1,36 @@
+from typing import Sequence, Union
+
+import numpy as np
+
+Vectors = Union[np.ndarray, Sequence[Sequence[float]]]
+
+
+def as_unit_matrix(vectors: Vectors) -> np.ndarray:
+    """
+    Stack embeddings into a float32 matrix with L2-normalized rows.
+    Zero vectors stay zero, so every similarity against them is 0.
+    """
+    matrix = np.array(vectors, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)  # Zero rows are left untouched
+    return matrix
+
+
+def cosine_matrix(left: Vectors, right: Vectors) -> np.ndarray:
+    """Many-to-many cosine similarities: entry [i, j] compares left[i] with right[j], in one matmul."""
+    return as_unit_matrix(left) @ as_unit_matrix(right).T
+
+
+def paired_cosine(left: Vectors, right: Vectors) -> np.ndarray:
+    """Row-wise cosine similarities of two equally long lists: left[i] vs right[i]."""
+    left_matrix, right_matrix = as_unit_matrix(left), as_unit_matrix(right)
+    if left_matrix.shape != right_matrix.shape:
+        raise ValueError(f"Cannot pair {left_matrix.shape[0]} embeddings with {right_matrix.shape[0]}")
+    return np.einsum("ij,ij->i", left_matrix, right_matrix)
+
+
+def cosine_to_query(query: Sequence[float], vectors: Vectors) -> np.ndarray:
+    """Similarity of every vector to one query embedding."""
+    if len(vectors) == 0:
+        return np.zeros(0, dtype=np.float32)
+    return cosine_matrix(vectors, [query])[:, 0]
@@ -1,14 +1,14 @@
 import asyncio
-from typing import Dict, List, Any, Tuple
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+from typing import Dict, List, Any, Optional, Tuple
 
-from app.services.pdf_service import PDFService, DocumentChunk
+from app.services.pdf_service import PDFService, DocumentChunk, ParsedDocument
 from app.services.llm_service import (
     get_openai_response, get_claude_response, 
     get_gemini_response, get_mistral_response
 )
-from app.services.embedding_service import get_embedding, get_embeddings_batch
+from app.services.embedding_service import get_embeddings_batch
+from app.services.similarity import cosine_to_query
+from app.services.rate_limiter import PRIORITY_BULK
 
 class SummarizationService:
     def __init__(self):
@@ -31,7 +31,7 @@ Instructions:
 
 Summary:"""
         
-        return await model_func(full_prompt)
+        return await model_func(full_prompt, priority=PRIORITY_BULK)
     
     async def get_all_summaries(self, document_text: str, user_prompt: str) -> Dict[str, str]:
         """Get summaries from all LLMs for the given document."""
@@ -45,7 +45,8 @@ Summary:"""
         results = await asyncio.gather(*tasks)
         return {model: response for model, response in results}
     
-    async def calculate_summary_similarities(self, original_text: str, summaries: Dict[str, str]) -> Dict[str, float]:
+    async def calculate_summary_similarities(self, original_text: str, summaries: Dict[str, str],
+                                             embedding_backend: Optional[str] = None) -> Dict[str, float]:
         """
         Calculate cosine similarities between the original document and each summary.
         Higher similarity = less hallucination (more faithful to original content).
@@ -61,20 +62,14 @@ Summary:"""
             return similarities
         
         try:
-            # Get embedding for the original document
-            original_embedding = await get_embedding(original_text)
-            
-            # Get embeddings for all valid summaries
-            summary_texts = list(valid_summaries.values())
-            summary_embeddings = await get_embeddings_batch(summary_texts)
+            # Embed the original document and all valid summaries in one request
+            embeddings = await get_embeddings_batch([original_text] + list(valid_summaries.values()),
+                                                    embedding_backend)
             
             # Calculate similarities between original document and each summary
-            for (model, _), summary_embedding in zip(valid_summaries.items(), summary_embeddings):
-                similarity = cosine_similarity(
-                    np.array(original_embedding).reshape(1, -1),
-                    np.array(summary_embedding).reshape(1, -1)
-                )[0][0]
-                similarities[model] = similarity
+            scores = cosine_to_query(embeddings[0], embeddings[1:])
+            for model, similarity in zip(valid_summaries, scores):
+                similarities[model] = float(similarity)
                 
         except Exception as e:
             # If anything fails, set all valid responses to 0.0
@@ -82,7 +77,8 @@ Summary:"""
         
         return similarities
     
-    async def process_chunked_document(self, chunks: List[DocumentChunk], user_prompt: str) -> Dict[str, Any]:
+    async def process_chunked_document(self, chunks: List[DocumentChunk], user_prompt: str,
+                                       embedding_backend: Optional[str] = None) -> Dict[str, Any]:
         """
         Process a chunked document by summarizing each chunk and then creating a final summary.
         """
@@ -93,7 +89,8 @@ Summary:"""
             chunk_summary_dict = await self.get_all_summaries(chunk.content, user_prompt)
             
             # Calculate similarities for this chunk
-            similarities = await self.calculate_summary_similarities(chunk.content, chunk_summary_dict)
+            similarities = await self.calculate_summary_similarities(chunk.content, chunk_summary_dict,
+                                                                    embedding_backend)
             
             # Find best summary for this chunk
             if similarities:
@@ -121,7 +118,8 @@ Summary:"""
         # Create a final summary from the combined chunk summaries
         final_prompt = f"Please create a cohesive summary from these section summaries: {user_prompt}"
         final_summaries = await self.get_all_summaries(combined_summary_text, final_prompt)
-        final_similarities = await self.calculate_summary_similarities(combined_summary_text, final_summaries)
+        final_similarities = await self.calculate_summary_similarities(combined_summary_text, final_summaries,
+                                                                        embedding_backend)
         
         # Find the best final summary
         if final_similarities:
@@ -142,7 +140,9 @@ Summary:"""
             }
         }
     
-    async def summarize_document(self, pdf_content: bytes, user_prompt: str) -> Dict[str, Any]:
+    async def summarize_document(self, pdf_content: Optional[bytes], user_prompt: str,
+                                 document: Optional[ParsedDocument] = None,
+                                 embedding_backend: Optional[str] = None) -> Dict[str, Any]:
         """
         Main method to summarize a PDF document.
         
@@ -152,8 +152,10 @@ Summary:"""
         3. Calculate similarity between original content and summaries
         4. Return the summary with highest similarity (least hallucination)
         """
-        # Prepare the document
-        doc_data = self.pdf_service.prepare_document_for_summarization(pdf_content, user_prompt)
+        # Prepare the document (extraction and chunking run off the event loop)
+        doc_data = await asyncio.to_thread(
+            self.pdf_service.prepare_document_for_summarization, pdf_content, user_prompt, document
+        )
         
         full_text = doc_data["full_text"]
         chunks = doc_data["chunks"]
@@ -161,11 +163,11 @@ Summary:"""
         
         if metadata["needs_chunking"]:
             # Process large document in chunks
-            result = await self.process_chunked_document(chunks, user_prompt)
+            result = await self.process_chunked_document(chunks, user_prompt, embedding_backend)
         else:
             # Process small document as a single unit
             summaries = await self.get_all_summaries(full_text, user_prompt)
-            similarities = await self.calculate_summary_similarities(full_text, summaries)
+            similarities = await self.calculate_summary_similarities(full_text, summaries, embedding_backend)
             
             # Find best summary
             if similarities:
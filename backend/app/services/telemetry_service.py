@@ -18,6 +18,7 @@ class TelemetryService:
         self.data_dir.mkdir(exist_ok=True)
         self.session_id = str(uuid.uuid4())
         self.user_id = self._get_or_create_user_id()
+        self.cancellations: Dict[str, int] = {}  # operation_type -> runs cancelled this session
         
     def _get_or_create_user_id(self) -> str:
         """Get or create a persistent anonymous user ID."""
@@ -114,6 +115,14 @@ class TelemetryService:
         
         await self.log_event("error_event", event_data)
     
+    async def log_cancellation_event(self, operation_type: str, context: Dict[str, Any] = None):
+        """Count and log a run that was cancelled (client disconnected or job cancelled)."""
+        self.cancellations[operation_type] = self.cancellations.get(operation_type, 0) + 1
+        await self.log_event("cancellation_event", {
+            "operation_type": operation_type,
+            "context": context or {}
+        })
+    
     async def log_performance_metrics(self, metrics: Dict[str, Any]):
         """Log performance metrics."""
         await self.log_event("performance_metrics", metrics)
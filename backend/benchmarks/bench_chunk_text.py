@@ -0,0 +1,87 @@
+"""
+PDFService.chunk_text scaling benchmark: prefix-offset chunking vs the legacy prefix-decode loop.
+
+The legacy loop decodes tokens[:start] and tokens[:end] for every chunk, which is
+quadratic, so it is only measured up to --legacy-max tokens.
+
+Usage (from backend/):
+    python -m benchmarks.bench_chunk_text [--sizes 10000,100000,500000,1000000,2000000] [--legacy-max 500000]
+"""
+import argparse
+import time
+from typing import List
+
+from app.services.pdf_service import PDFService, DocumentChunk
+from benchmarks.bench_token_counting import build_text
+
+
+def legacy_chunk_text(service: PDFService, text: str, max_tokens: int = 6000,
+                      overlap_tokens: int = 200) -> List[DocumentChunk]:
+    """The previous implementation, kept here for comparison."""
+    tokenizer = service.tokenizer
+    tokens = tokenizer.encode(text)
+    chunks = []
+
+    if len(tokens) <= max_tokens:
+        return [DocumentChunk(content=text, chunk_index=0, start_char=0,
+                              end_char=len(text), token_count=len(tokens))]
+
+    start_idx = 0
+    chunk_index = 0
+    while start_idx < len(tokens):
+        end_idx = min(start_idx + max_tokens, len(tokens))
+        chunk_tokens = tokens[start_idx:end_idx]
+        chunk_text = tokenizer.decode(chunk_tokens)
+        start_char = len(tokenizer.decode(tokens[:start_idx])) if start_idx > 0 else 0
+        end_char = len(tokenizer.decode(tokens[:end_idx]))
+        chunks.append(DocumentChunk(content=chunk_text, chunk_index=chunk_index, start_char=start_char,
+                                    end_char=end_char, token_count=len(chunk_tokens)))
+        start_idx = end_idx - overlap_tokens
+        chunk_index += 1
+        if end_idx >= len(tokens):
+            break
+    return chunks
+
+
+def text_with_tokens(service: PDFService, target_tokens: int) -> str:
+    """Grow synthetic text until it encodes to at least target_tokens, then trim."""
+    text = build_text(target_tokens * 4)
+    while service.count_tokens(text) < target_tokens:
+        text += " " + build_text(target_tokens, seed=len(text))
+    tokens = service.tokenizer.encode(text)[:target_tokens]
+    return service.tokenizer.decode(tokens)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10000,100000,500000,1000000,2000000")
+    parser.add_argument("--legacy-max", type=int, default=500_000)
+    args = parser.parse_args()
+
+    service = PDFService()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    print(f"\n📊 CHUNK_TEXT SCALING BENCHMARK (max_tokens=6000, overlap=200)")
+    print(f"   {'tokens':>10}  {'chunks':>7}  {'linear':>9}  {'legacy':>9}  {'speedup':>8}")
+
+    for size in sizes:
+        text = text_with_tokens(service, size)
+
+        start = time.perf_counter()
+        chunks = service.chunk_text(text)
+        linear_time = time.perf_counter() - start
+
+        legacy_cell, speedup_cell = "skipped", "-"
+        if size <= args.legacy_max:
+            start = time.perf_counter()
+            legacy_chunks = legacy_chunk_text(service, text)
+            legacy_time = time.perf_counter() - start
+            assert chunks == legacy_chunks, f"chunk output differs at {size:,} tokens"
+            legacy_cell = f"{legacy_time:.3f}s"
+            speedup_cell = f"{legacy_time / linear_time:.1f}x"
+
+        print(f"   {size:>10,}  {len(chunks):>7,}  {linear_time:>8.3f}s  {legacy_cell:>9}  {speedup_cell:>8}")
+
+
+if __name__ == "__main__":
+    main()